@@ -1,17 +1,36 @@
+import base64
+import hashlib
 import json
 import os
+from startup import Lazy, StartupTimer, warm_up, MODEL_WARMUP
+
+startup_timer = StartupTimer()
+
 from flask import Flask, request, jsonify, send_from_directory,render_template
 from flask_cors import CORS
 from nltk.tokenize import TreebankWordTokenizer
 import traceback
-from similarity import build_inverted_index, compute_doc_norms, compute_idf, search, build_semantic_search, semantic_search, stop_words, punctuation
+from similarity import build_inverted_index, compute_doc_norms, compute_idf, search, build_semantic_search, restore_semantic_search, semantic_search, stop_words, punctuation, ensure_description_tokens, build_topic_words, count_terms
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import joblib
-from sklearn.metrics.pairwise import cosine_similarity
-from sentiment_utils import load_course_sentiments, get_query_sentiment, adjust_bert_scores_with_sentiment
+from sentiment_utils import load_course_sentiments, get_query_sentiment, get_query_sentiments, adjust_scores_with_sentiment, sentiment_batcher, sentiment_model
+from snapshot import DEFAULT_SNAPSHOT_DIR, SOURCE_FILES, load_snapshot
+from vector_index import EmbeddingIndex, top_k as top_k_indices
+from query_analysis import QueryAnalysis, normalize_query, query_embedding_cache
+from batching import MicroBatcher
+from keyword_index import KeywordIndex
+from bm25 import BM25Index, search_bm25
+from catalog import CourseCatalog
+from fusion import FUSION_DEPTH, FUSION_WEIGHTS, SEARCH_FUSION, fuse
+from feedback import FeedbackStore, check_id_list, parse_id_list
+from neighbours import load_neighbour_graphs
+from caching import LRUCache, make_result_cache, source_fingerprint
+from http_cache import SerializedJSON, serve_serialized
+from process_stats import process_memory
+from onnx_inference import INFERENCE_BACKEND, OnnxSentenceEncoder
 
 tokenizer = TreebankWordTokenizer()
+startup_timer.mark("imports")
 
 def load_search_module():
     try:
@@ -25,31 +44,68 @@ current_directory = os.path.dirname(os.path.abspath(__file__))
 
 courses_path = os.path.join(current_directory, 'courses_w_tokens.json')
 reviews_path = os.path.join(current_directory, 'course_reviews.json')
+sentiments_path = os.path.join(current_directory, 'review_sentiments.json')
+scaled_sentiments_path = os.path.join(current_directory, 'scaled_sentiment_scores.json')
+
+snapshot = None
+try:
+    snapshot = load_snapshot(DEFAULT_SNAPSHOT_DIR)
+    if snapshot:
+        print(f"Loaded search snapshot v{snapshot['manifest']['version']} from {DEFAULT_SNAPSHOT_DIR}")
+    else:
+        print("No usable search snapshot found, search indexes will be built on first use")
+except Exception as e:
+    print(f"Error loading search snapshot: {str(e)}")
+    traceback.print_exc()
+    snapshot = None
+startup_timer.mark("snapshot")
+
+def load_query_model():
+    if INFERENCE_BACKEND == "onnx":
+        return OnnxSentenceEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+# The query encoder is loaded on first use or by warm_up(); importing torch is most of its cost
+query_model = Lazy(load_query_model, "query encoder")
 
 try:
     print("Loading BERT embeddings...")
-    course_codes, bert_embeddings = joblib.load("bert_embeddings.joblib")
-    title_course_codes, title_embeddings = joblib.load("bert_title_embeddings.joblib")
-    bert_model = SentenceTransformer("all-MiniLM-L6-v2")
-    print("Successfully loaded BERT embeddings")
+    if snapshot:
+        course_codes, bert_embeddings = snapshot["course_codes"], snapshot["bert_embeddings"]
+        title_course_codes, title_embeddings = snapshot["title_course_codes"], snapshot["title_embeddings"]
+    else:
+        course_codes, bert_embeddings = joblib.load(SOURCE_FILES["bert_embeddings"])
+        title_course_codes, title_embeddings = joblib.load(SOURCE_FILES["bert_title_embeddings"])
+    embedding_index = EmbeddingIndex(
+        course_codes, bert_embeddings, title_course_codes, title_embeddings, normalized=bool(snapshot))
+    embedding_index.load_backends(DEFAULT_SNAPSHOT_DIR if snapshot else None)
+    # The index holds its own normalized copies; drop the unpickled float32 matrices.
+    bert_embeddings = title_embeddings = None
+    print(f"Successfully loaded BERT embeddings ({embedding_index.backend.name} vector index)")
 except Exception as e:
     print("Error loading BERT embeddings:", e)
     bert_embeddings = None
+    embedding_index = None
     course_codes = []
-    bert_model = None
+    title_course_codes = []
+startup_timer.mark("embeddings")
     
-course_sentiments = load_course_sentiments()
+course_sentiments = load_course_sentiments(sentiments_path)
 
 try:
-    with open("scaled_sentiment_scores.json", "r") as f:
+    with open(scaled_sentiments_path, "r") as f:
         scaled_sentiments = json.load(f)
 except:
     print("failed to get scaled_sentiments")
     scaled_sentiments = {}
 
 try:
-    with open(courses_path, 'r') as file:
-        courses = json.load(file)
+    if snapshot:
+        courses = snapshot["courses"]
+    else:
+        with open(courses_path, 'r') as file:
+            courses = json.load(file)
     with open(reviews_path, 'r') as file:
         reviews = json.load(file)
     
@@ -62,14 +118,9 @@ except Exception as e:
     courses = {}
     reviews = {}
 
-for code, data in courses.items():
-    if 'description_tokens' not in data or not data['description_tokens']:
-        if 'description' in data and data['description']:
-            data['description_tokens'] = tokenizer.tokenize(data['description'].lower())
-            print(f"Generated tokens for {code}")
-        else:
-            data['description_tokens'] = []
-            print(f"Created empty tokens for {code}")
+generated_tokens = ensure_description_tokens(courses, tokenizer)
+if generated_tokens:
+    print(f"Generated description tokens for {generated_tokens} courses")
 
 courses_list = []
 try:
@@ -83,6 +134,12 @@ except Exception as e:
     print(f"Error merging data: {str(e)}")
     courses_list = []
 
+catalog = CourseCatalog(courses_list)
+catalog.align("description", course_codes)
+catalog.align("title", title_course_codes)
+catalog.load_features(course_sentiments, scaled_sentiments)
+startup_timer.mark("courses")
+
 STATIC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'react-frontend', 'static'))
 
 
@@ -95,144 +152,167 @@ CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:5000","http://127.0.0.1:5001", "http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:3000", "http://4300showcase.infosci.cornell.edu:5239" ],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization"],
+        "expose_headers": ["X-Feedback-Session"]
     }
 })
 
 (build_inverted_index, compute_doc_norms, compute_idf, search_function, build_semantic_search, semantic_search) = load_search_module()
 
-inv_idx = {}
-idf = {}
-doc_norms = []
-
-if build_inverted_index and compute_idf and compute_doc_norms and courses_list:
+# Ranking used for keyword retrieval: "tfidf" (cosine, as in similarity.search) or "bm25"
+KEYWORD_RANKER = os.environ.get("KEYWORD_RANKER", "tfidf")
+
+def load_keyword_indexes():
+    """
+    The inverted index, idf, doc norms, KeywordIndex and (with KEYWORD_RANKER=bm25) BM25Index,
+    from the snapshot or built from courses_list when there is none.
+    """
+    indexes = {"inv_idx": {}, "idf": {}, "doc_norms": [], "keyword_index": None, "bm25_index": None}
+    if snapshot:
+        indexes.update(inv_idx=snapshot["inv_idx"], idf=snapshot["idf"], doc_norms=snapshot["doc_norms"])
+        print("Loaded search index from snapshot")
+    elif build_inverted_index and compute_idf and compute_doc_norms and courses_list:
+        try:
+            print("Building search index...")
+            inv_idx = build_inverted_index(courses_list, n_jobs=int(os.environ.get("INDEX_BUILD_JOBS", 1)))
+            idf = compute_idf(inv_idx, len(courses_list))
+            doc_norms = compute_doc_norms(inv_idx, idf, len(courses_list))
+            inv_idx = {key: val for key, val in inv_idx.items() if key in idf}
+            indexes.update(inv_idx=inv_idx, idf=idf, doc_norms=doc_norms)
+            print("Successfully built search index")
+        except Exception as e:
+            print(f"Error building search index: {str(e)}")
+            traceback.print_exc()
+    else:
+        print("Search functions not properly loaded or no courses available. Search functionality will be limited.")
+
+    inv_idx, idf, doc_norms = indexes["inv_idx"], indexes["idf"], indexes["doc_norms"]
+    if inv_idx and len(doc_norms) > 0:
+        try:
+            indexes["keyword_index"] = KeywordIndex(inv_idx, idf, doc_norms)
+            print(f"Built keyword scoring matrix with {indexes['keyword_index'].matrix.nnz} postings")
+        except Exception as e:
+            print(f"Error building keyword scoring matrix: {str(e)}")
+            traceback.print_exc()
+
+    if KEYWORD_RANKER == "bm25" and inv_idx:
+        try:
+            indexes["bm25_index"] = BM25Index(inv_idx, len(doc_norms))
+            print("Built BM25 impact-ordered index")
+        except Exception as e:
+            print(f"Error building BM25 index: {str(e)}")
+            traceback.print_exc()
+    return indexes
+
+def load_semantic_index():
+    """The fitted TF-IDF vectorizer and SVD (restored from the snapshot or fitted now) and the SVD topic words"""
+    vectorizer, svd, X_reduced = None, None, None
     try:
-        print("Building search index...")
-        inv_idx = build_inverted_index(courses_list)
-        idf = compute_idf(inv_idx, len(courses_list))
-        doc_norms = compute_doc_norms(inv_idx, idf, len(courses_list))
-        inv_idx = {key: val for key, val in inv_idx.items() if key in idf}
-        print("Successfully built search index")
+        if snapshot:
+            vectorizer, svd = restore_semantic_search(
+                snapshot["tfidf_vocabulary"], snapshot["tfidf_idf"], snapshot["svd_components"], tokenizer)
+            X_reduced = snapshot["X_reduced"]
+            print("Loaded semantic search index from snapshot")
+        else:
+            print("Building semantic search index...")
+            vectorizer, svd, X_reduced = build_semantic_search(courses_list, tokenizer)
+            print("Successfully built semantic search index")
     except Exception as e:
-        print(f"Error building search index: {str(e)}")
+        print(f"Error building semantic search index: {str(e)}")
         traceback.print_exc()
-else:
-    print("Search functions not properly loaded or no courses available. Search functionality will be limited.")
-
-vectorizer = None
-svd = None
-X_reduced = None
-
-try:
-    print("Building semantic search index...")
-    vectorizer, svd, X_reduced = build_semantic_search(courses_list, tokenizer)
-    print("Successfully built semantic search index")
-except Exception as e:
-    print(f"Error building semantic search index: {str(e)}")
-    traceback.print_exc()
+    # SVD explanations: the top words of every topic
+    topic_words = build_topic_words(vectorizer, svd) if vectorizer and svd else []
+    return {"vectorizer": vectorizer, "svd": svd, "X_reduced": X_reduced, "topic_words": topic_words}
 
-def compute_keyword_scores(query, inv_idx, idf, doc_norms, tokenizer, stop_words, punctuation):
-    query_token = tokenizer.tokenize(query.lower())
-    query_token = [t for t in query_token if t.lower() not in stop_words and t not in punctuation]
-    
-    q_counts = {}
-    for q in query_token:
-        q_counts[q] = q_counts.get(q, 0) + 1
+# The keyword and SVD indexes are loaded (from the snapshot) or built (without one) on first use or
+# by warm_up(), so importing app, e.g. from a script or `flask routes`, does not pay for them.
+keyword_indexes = Lazy(load_keyword_indexes, "keyword index")
+semantic_index = Lazy(load_semantic_index, "semantic index")
 
-    from similarity import accumulate_dot_scores
-    dot_scores, _ = accumulate_dot_scores(q_counts, inv_idx, idf)
-    
-    q_tf_idf = {word: count * idf.get(word, 0) for word, count in q_counts.items()}
-    q_norm = np.sqrt(sum(value ** 2 for value in q_tf_idf.values()))
+def get_keyword_index():
+    return keyword_indexes.get()["keyword_index"]
 
-    doc_score_lookup = {}
-    for doc_id, numerator in dot_scores.items():
-        denominator = q_norm * doc_norms[doc_id]
-        if denominator:
-            score = numerator / denominator
-            doc_score_lookup[doc_id] = score
+# Each course's description terms, for the SVD explanations
+course_token_sets = [frozenset(count_terms(course.get("description_tokens", []))) for course in courses_list]
+startup_timer.mark("search indexes")
 
-    return doc_score_lookup
+# Identifies the data and indexes behind a ranking, so cached results from an older build are never served
+if snapshot:
+    index_version = "snapshot-" + hashlib.sha1(json.dumps(snapshot["manifest"], sort_keys=True).encode()).hexdigest()[:12]
+else:
+    index_version = "files-" + source_fingerprint([courses_path, SOURCE_FILES["bert_embeddings"], SOURCE_FILES["bert_title_embeddings"]])
+# Reviews and sentiment scores are read from their own files even with a snapshot, and they change the
+# ranking and the review fields of the results, so a review or sentiment refresh starts a new version too.
+index_version += "-reviews-" + source_fingerprint([reviews_path, sentiments_path, scaled_sentiments_path])
+index_version += f"-{KEYWORD_RANKER}-{embedding_index.backend.name if embedding_index is not None else 'none'}"
+index_version += f"-{SEARCH_FUSION}-{FUSION_DEPTH}-" + ",".join(f"{name}={weight}" for name, weight in sorted(FUSION_WEIGHTS.items()))
+
+# Precomputed top-K course neighbours (neighbours.py). Without them /api/course scans every course per request.
+neighbour_graphs = {"bert": None, "keyword": None}
+if snapshot:
+    try:
+        neighbour_graphs = load_neighbour_graphs(DEFAULT_SNAPSHOT_DIR)
+        if neighbour_graphs["bert"] is not None and (embedding_index is None or len(neighbour_graphs["bert"]) != len(embedding_index)):
+            print("BERT neighbour graph does not match the embeddings, ignoring it")
+            neighbour_graphs["bert"] = None
+        if neighbour_graphs["keyword"] is not None and len(neighbour_graphs["keyword"]) != len(catalog):
+            print("Keyword neighbour graph does not match the catalog, ignoring it")
+            neighbour_graphs["keyword"] = None
+        print("Loaded course neighbour graphs: " + ", ".join(name for name, graph in neighbour_graphs.items() if graph is not None))
+    except Exception as e:
+        print(f"Error loading course neighbour graphs: {str(e)}")
+        traceback.print_exc()
 
-def get_svd_matching_words(query, course_description, vectorizer, svd, tokenizer, top_n_topics=5, top_n_words=10):
-    if not vectorizer or not svd:
+# Finished /api/search and /api/course responses. With RESULT_CACHE_DIR set they live in a
+# SQLite file there, shared by every worker process; otherwise each process keeps its own.
+search_result_cache = make_result_cache(
+    "search_results",
+    maxsize=int(os.environ.get("RESULT_CACHE_SIZE", 2048)),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", 3600)),
+    directory=os.environ.get("RESULT_CACHE_DIR"),
+)
+
+def result_cache_key(kind, query, relevant_ids, non_relevant_ids):
+    # Rocchio averages the feedback vectors, so their order does not change the ranking
+    return (kind, index_version, catalog.version, query,
+            tuple(sorted(map(str, relevant_ids))), tuple(sorted(map(str, non_relevant_ids))))
+
+def compute_keyword_scores(query):
+    """Keyword cosine score of every course for the query, indexed like courses_list"""
+    keyword_index = get_keyword_index()
+    if keyword_index is None:
+        return np.zeros(len(courses_list))
+    return keyword_index.score(query, tokenizer)
+
+def keyword_search(query, top_k=20):
+    """Top-k (score, idx) keyword matches using the configured KEYWORD_RANKER"""
+    bm25_index = keyword_indexes.get()["bm25_index"]
+    if bm25_index is not None:
+        return search_bm25(query, bm25_index, top_k, tokenizer)
+    return get_keyword_index().search(query, top_k, tokenizer=tokenizer)
+
+def get_query_topic_words(analysis, top_n_topics=5):
+    """Union of the top words of the query's strongest SVD topics, projected once per request"""
+    def compute():
+        semantic = semantic_index.get()
+        vectorizer, svd = semantic["vectorizer"], semantic["svd"]
+        if not vectorizer or not svd:
+            return frozenset()
+        query_reduced = svd.transform(vectorizer.transform([analysis.query]))[0]
+        top_topic_indices = query_reduced.argsort()[::-1][:top_n_topics]
+        return frozenset().union(*(semantic["topic_words"][i] for i in top_topic_indices))
+    return analysis.memo("svd_topic_words", compute)
+
+def get_svd_matching_words(query_topic_words, course_idx):
+    if course_idx is None or course_idx >= len(course_token_sets):
         return []
+    return sorted(query_topic_words & course_token_sets[course_idx])
 
-    query_vec = vectorizer.transform([query])
-    query_reduced = svd.transform(query_vec)[0]
-    top_topic_indices = query_reduced.argsort()[::-1][:top_n_topics]
-
-    terms = vectorizer.get_feature_names_out()
-    components = svd.components_
-
-    top_topic_words = set()
-    for topic_idx in top_topic_indices:
-        word_weights = components[topic_idx]
-        top_indices = word_weights.argsort()[::-1][:top_n_words]
-        for i in top_indices:
-            top_topic_words.add(terms[i])
-
-    course_tokens = tokenizer.tokenize(course_description.lower())
-    filtered_tokens = [t for t in course_tokens if t not in stop_words and t not in punctuation]
-
-    matched_words = [word for word in filtered_tokens if word in top_topic_words]
-    return list(set(matched_words))
-
-def calculate_average_ratings(reviews):
-    if not reviews:
-        return {
-            'avgDifficulty': 0,
-            'avgWorkload': 0,
-            'avgOverall': 0
-        }
-    
-    difficulty_sum = 0
-    difficulty_count = 0
-    workload_sum = 0
-    workload_count = 0
-    overall_sum = 0
-    overall_count = 0
-    
-    for review in reviews:
-        if 'difficulty' in review and review['difficulty'] != '-':
-            try:
-                difficulty_sum += int(review['difficulty'])
-                difficulty_count += 1
-            except (ValueError, TypeError):
-                pass
-        
-        if 'workload' in review and review['workload'] != '-':
-            try:
-                workload_sum += int(review['workload'])
-                workload_count += 1
-            except (ValueError, TypeError):
-                pass
-        
-        if 'overall' in review and review['overall'] != '-':
-            try:
-                overall_sum += int(review['overall'])
-                overall_count += 1
-            except (ValueError, TypeError):
-                pass
-    
-    return {
-        'avgDifficulty': difficulty_sum / difficulty_count if difficulty_count > 0 else 0,
-        'avgWorkload': workload_sum / workload_count if workload_count > 0 else 0,
-        'avgOverall': overall_sum / overall_count if overall_count > 0 else 0
-    }
+def bert_search(analysis, top_k=10):
+    return embedding_index.search(analysis.embedding, top_k)
 
-def bert_search(query, top_k=10):
-    query_embedding = bert_model.encode([query])
-    similarities = cosine_similarity(query_embedding, bert_embeddings)[0]
-    top_indices = similarities.argsort()[::-1][:top_k]
-    results = [(similarities[i], i) for i in top_indices]
-    return results
-
-def get_bert_title_similarity_scores(query, top_k=10):
-    query_vec = bert_model.encode([query])
-    sims = cosine_similarity(query_vec, title_embeddings)[0]
-    score_map = {code: sim for code, sim in zip(title_course_codes, sims)}
-    return score_map
+def get_bert_title_similarity_scores(analysis, course_codes):
+    return embedding_index.title_scores(analysis.embedding, course_codes)
 
 def simple_search(query, courses):
     """Fallback search function that uses basic string matching"""
@@ -258,6 +338,195 @@ def simple_search(query, courses):
     return results
 
 
+def search_courses(query, relevant_ids, non_relevant_ids, feedback_vector=None):
+    """
+    The formatted /api/search results for a query, after Rocchio feedback and sentiment rescoring.
+    feedback_vector, the feedback session's Rocchio vector for these ids, is used instead of recomputing the centroids.
+    """
+    print(f"API Search: Searching for: {query}")
+    
+    search_results = []
+    analysis = QueryAnalysis(query, encode_query_with_bert)
+    
+    query_sentiment = get_query_sentiment(query)
+    
+  
+    if embedding_index is not None:
+        query_vector = analysis.embedding
+        if relevant_ids or non_relevant_ids:
+            print("Applying Rocchio adjustment based on feedback")
+            if feedback_vector is not None:
+                query_vector = feedback_vector
+            else:
+                query_vector = feedback_query_vector(analysis.embedding, relevant_ids, non_relevant_ids)
+
+        if SEARCH_FUSION == "bert":
+            print("Using BERT semantic search")
+            search_results = catalog.to_catalog_rows(bert_search_with_query_vector(query_vector, top_k=20))
+        else:
+            print(f"Using hybrid search ({SEARCH_FUSION} fusion)")
+            search_results, bert_scores, keyword_scores = hybrid_candidates(
+                query, query_vector, embedding_index.search(query_vector, FUSION_DEPTH),
+                embedding_index.title_search_many(analysis.embedding, FUSION_DEPTH)[0], relevant_ids, non_relevant_ids)
+            return format_search_results(analysis, search_results, query_sentiment, keyword_scores, bert_scores)
+    else:
+        keyword_index = get_keyword_index()
+        if keyword_index is not None:
+            try:
+                search_results = keyword_search(query, 20)
+            except Exception as e:
+                print(f"Error in vector search: {e}")
+                traceback.print_exc()
+                search_results = simple_search(query, courses_list)
+        else:
+            print("Using simple search fallback")
+            search_results = simple_search(query, courses_list)
+    
+    return format_search_results(analysis, search_results, query_sentiment, compute_keyword_scores(query))
+
+
+def hybrid_candidates(query, query_vector, description_results, title_results, relevant_ids=(), non_relevant_ids=()):
+    """
+    Fuses one query's description BERT, title BERT and keyword candidates, and scores only their union.
+
+    With feedback, query_vector is the Rocchio vector, which title and keyword retrieval never see,
+    so fusion alone would bring back the courses marked non-relevant. Those are dropped, and the
+    whole fused list is re-ranked by cosine similarity to query_vector.
+
+    Args:
+        description_results (list): (score, embedding_row) description matches for query_vector.
+        title_results (list): (score, title_row) title matches.
+        relevant_ids (list): Course codes marked relevant.
+        non_relevant_ids (list): Course codes marked non-relevant.
+
+    Returns:
+        tuple: The top 20 fused (score, catalog_row) pairs, and dicts of the description BERT and keyword scores of those rows.
+    """
+    keyword_index = get_keyword_index()
+    rankings = {
+        "description": catalog.to_catalog_rows(description_results),
+        "title": catalog.to_catalog_rows(title_results, "title"),
+        "keyword": keyword_search(query, FUSION_DEPTH) if keyword_index is not None else [],
+    }
+    feedback = bool(relevant_ids or non_relevant_ids)
+    candidates = fuse(rankings)
+    if feedback:
+        excluded = {catalog.row(code) for code in non_relevant_ids}
+        candidates = [(score, row) for score, row in candidates if row not in excluded]
+    else:
+        candidates = candidates[:20]
+    rows = [row for _, row in candidates]
+
+    embedding_rows = [catalog.embedding_row(catalog.codes[row]) for row in rows]
+    embedded = [i for i, embedding_row in enumerate(embedding_rows) if embedding_row is not None]
+    bert_scores = np.zeros(len(rows))
+    bert_scores[embedded] = embedding_index.description_scores(query_vector, [embedding_rows[i] for i in embedded])
+    if feedback:
+        best = top_k_indices(bert_scores, 20)
+        rows, bert_scores = [rows[i] for i in best], bert_scores[best]
+        candidates = [(float(score), row) for score, row in zip(bert_scores, rows)]
+    keyword_scores = keyword_index.score_docs(query, rows, tokenizer) if keyword_index is not None else np.zeros(len(rows))
+    return candidates, dict(zip(rows, bert_scores.tolist())), dict(zip(rows, keyword_scores.tolist()))
+
+
+def format_search_results(analysis, search_results, query_sentiment, keyword_scores, bert_scores=None):
+    """
+    Rescores (score, catalog_row) candidates by sentiment and formats the top 10 as /api/search returns them.
+    keyword_scores and bert_scores are indexed by catalog row; without bert_scores the candidate
+    scores are shown as the BERT similarity.
+    """
+    if not search_results:
+        print("No search results found")
+        return []
+    
+    rescored = adjust_scores_with_sentiment(query_sentiment, catalog.sentiment, search_results, alpha=0.3)
+    top_results = sorted(rescored, key=lambda x: -x[0])[:10]
+        
+    result = []
+    seen_descriptions = set()
+    for item in top_results:
+        score, idx = item
+        course = catalog[idx]
+        description = course.get("description")
+        if description and description not in seen_descriptions:
+            seen_descriptions.add(description)
+            result.append((idx, course, round(score, 4)))
+    
+    print(f"Found {len(result)} results")
+
+    title_score_map = get_bert_title_similarity_scores(analysis, [course.get("course_code") for _, course, _ in result])
+    
+    formatted_results = []
+    for idx, course, similarity_score in result:
+        try:
+            course_copy = course.copy()
+            if "description_tokens" in course_copy:
+                del course_copy["description_tokens"]
+                
+            course_copy.update(catalog.ratings(idx))
+            course_code = course_copy.get("course_code")
+            
+            course_copy["sentiment_score"] = float(catalog.scaled_sentiment[idx])
+            
+            if bert_scores is not None:
+                similarity_score = bert_scores[idx]
+            course_copy["BERT_similarity_score"] = round(similarity_score * 100, 0)
+            
+            course_copy["keyword_score"] = round(float(keyword_scores[idx]) * 100, 0)
+            
+            raw_score = title_score_map.get(course_code, 0)
+            course_copy["BERT_title_similarity_score"] = round(raw_score * 100, 0)
+
+            course_copy["svd_top_words"] = get_svd_matching_words(get_query_topic_words(analysis), idx)
+            
+            formatted_results.append(course_copy)
+        except Exception as e:
+            print(f"Error formatting course: {e}")
+    return formatted_results
+
+
+def search_courses_batch(queries):
+    """
+    search_courses for many (query, relevant_ids, non_relevant_ids) triples at once: the queries
+    are embedded in one model batch, and the description and title candidates of the whole
+    batch each come from one matrix-matrix product.
+    """
+    analyses = [QueryAnalysis(query, encode_query_with_bert) for query, _, _ in queries]
+    sentiments = get_query_sentiments([query for query, _, _ in queries])
+    keyword_index = get_keyword_index()
+
+    search_results = [[] for _ in queries]
+    if embedding_index is not None:
+        missing = list(dict.fromkeys(a.normalized for a in analyses if a.normalized not in query_embedding_cache))
+        if missing:
+            for text, vector in zip(missing, query_model.get().encode(missing, batch_size=64)):
+                query_embedding_cache.set(text, vector)
+        query_vectors = np.stack([
+            feedback_query_vector(analysis.embedding, relevant_ids, non_relevant_ids)
+            for analysis, (_, relevant_ids, non_relevant_ids) in zip(analyses, queries)])
+        if SEARCH_FUSION != "bert":
+            description_results = embedding_index.search_many(query_vectors, FUSION_DEPTH)
+            title_results = embedding_index.title_search_many(np.stack([a.embedding for a in analyses]), FUSION_DEPTH)
+            hybrid = [hybrid_candidates(query, vector, description, titles, relevant_ids, non_relevant_ids)
+                      for (query, relevant_ids, non_relevant_ids), vector, description, titles
+                      in zip(queries, query_vectors, description_results, title_results)]
+            return [format_search_results(analysis, results, sentiment, keyword_scores, bert_scores)
+                    for analysis, sentiment, (results, bert_scores, keyword_scores) in zip(analyses, sentiments, hybrid)]
+        search_results = [catalog.to_catalog_rows(results) for results in embedding_index.search_many(query_vectors, 20)]
+    elif keyword_index is not None:
+        search_results = [keyword_search(query, 20) for query, _, _ in queries]
+    else:
+        search_results = [simple_search(query, courses_list) for query, _, _ in queries]
+
+    if keyword_index is not None:
+        keyword_scores = keyword_index.score_many([query for query, _, _ in queries], tokenizer)
+    else:
+        keyword_scores = np.zeros((len(queries), len(courses_list)))
+
+    return [format_search_results(analysis, results, sentiment, scores)
+            for analysis, results, sentiment, scores in zip(analyses, search_results, sentiments, keyword_scores)]
+
+
 @app.route("/api/search", methods=["GET"])
 def api_search():
     try:
@@ -265,16 +534,11 @@ def api_search():
 
 
         #### ROCCHIO
-        import ast
-
-        relevant_ids = request.args.get('relevant_ids', None)
-        non_relevant_ids = request.args.get('non_relevant_ids', None)
-
-        # Parse them safely
-        relevant_ids = ast.literal_eval(relevant_ids) if relevant_ids else []
-        non_relevant_ids = ast.literal_eval(non_relevant_ids) if non_relevant_ids else []
-        print(relevant_ids)
-        print(non_relevant_ids)
+        try:
+            relevant_ids = parse_id_list(request.args.get('relevant_ids'))
+            non_relevant_ids = parse_id_list(request.args.get('non_relevant_ids'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid feedback ids: {e}"}), 400
 
 
         #### ROCCHIO
@@ -284,114 +548,14 @@ def api_search():
         
         if not courses_list:
             return jsonify({"error": "No course data available. Please ensure the required data files are present."}), 500
-        
-        print(f"API Search: Searching for: {query}")
-        
-        search_results = []
-        
-        query_sentiment = get_query_sentiment(query)
-        
-      
-        if bert_model and bert_embeddings is not None:
-            print("Using BERT semantic search")
-            search_results = bert_search(query, 20)
-        else:
-            if search_function and inv_idx and idf is not None and doc_norms is not None and len(doc_norms) > 0:
-                try:
-                    search_results = search_function(query, inv_idx, idf, doc_norms)
-                except Exception as e:
-                    print(f"Error in vector search: {e}")
-                    traceback.print_exc()
-                    search_results = simple_search(query, courses_list)
-            else:
-                print("Using simple search fallback")
-                search_results = simple_search(query, courses_list)
-        #### ROCCHIO
-                
-        rel_codes = relevant_ids  # list of strings
-        rel_indices = [ course_codes.index(c) for c in rel_codes if c in course_codes ]
-        nonrel_codes = non_relevant_ids
-        nonrel_indices = [ course_codes.index(c) for c in nonrel_codes if c in course_codes ]
-        if relevant_ids or non_relevant_ids:
-            print("Applying Rocchio adjustment based on feedback")
-            relevant_vectors = [bert_embeddings[i] for i in rel_indices]
-            non_relevant_vectors = [bert_embeddings[i] for i in nonrel_indices]
 
-            # Assuming bert_search(query) uses embeddings
-            query_vector = encode_query_with_bert(query)  # you might have a function like this
-            
-            updated_query_vector = rocchio_update(query_vector, relevant_vectors, non_relevant_vectors)
-            
-            # Now re-search using the adjusted query vector
-            search_results = bert_search_with_query_vector(updated_query_vector, top_k=20)
-
-        #### ROCCHIO
-        
-        keyword_search_results = search_function(query, inv_idx, idf, doc_norms)
-        keyword_score_map = {idx: round(score * 100, 0) for score, idx, *_ in keyword_search_results}
-        title_score_map = get_bert_title_similarity_scores(query)
-            
-        if not search_results:
-            print("No search results found")
-            return jsonify([])
-        
-        def adjusted_score(score, course):
-            review_count = len(course.get("reviews", []))
-            return score * (1 + np.log1p(review_count))
-
-      
-        
-        rescored = adjust_bert_scores_with_sentiment(query_sentiment, course_sentiments, search_results, course_codes, alpha=0.3)
-        top_results = sorted(rescored, key=lambda x: -x[0])[:10]
-            
-        result = []
-        seen_descriptions = set()
-        for item in top_results:
-            score, idx = item
-            if idx < len(courses_list):
-                course = courses_list[idx]
-                description = course.get("description")
-                if description and description not in seen_descriptions:
-                    seen_descriptions.add(description)
-                    result.append((course, round(score, 4)))
-            else:
-                print(f"Invalid index {idx} (out of range)")
-        
-        print(f"Found {len(result)} results")
-        
-        formatted_results = []
-        for course, similarity_score in result:
-            try:
-                course_copy = course.copy()
-                if "description_tokens" in course_copy:
-                    del course_copy["description_tokens"]
-                    
-                ratings = calculate_average_ratings(course_copy.get("reviews", []))
-                course_copy.update(ratings)
-                course_code = course_copy.get("course_code")
-                
-                course_copy["sentiment_score"] = scaled_sentiments.get(course_code, 50)
-                
-                course_copy["BERT_similarity_score"] = round(similarity_score * 100, 0)
-                
-                idx = next((i for i, c in enumerate(courses_list) if c.get("course_code") == course_copy.get("course_code")), None)
-                course_copy["keyword_score"] = keyword_score_map.get(idx, 0)
-                
-                raw_score = title_score_map.get(course_code, 0)
-                course_copy["BERT_title_similarity_score"] = round(raw_score * 100, 0)
-
-                course_copy["svd_top_words"] = get_svd_matching_words(
-                    query,
-                    course_copy.get("description", ""),
-                    vectorizer,
-                    svd,
-                    tokenizer
-                )
-                
-                formatted_results.append(course_copy)
-            except Exception as e:
-                print(f"Error formatting course: {e}")
-        return jsonify(formatted_results)
+        session_id, feedback_vector = open_feedback_session(
+            ("search", normalize_query(query)), lambda: QueryAnalysis(query, encode_query_with_bert).embedding,
+            relevant_ids, non_relevant_ids)
+        key = result_cache_key("search", normalize_query(query), relevant_ids, non_relevant_ids)
+        formatted_results = search_result_cache.get_or_compute(
+            key, lambda: search_courses(query, relevant_ids, non_relevant_ids, feedback_vector))
+        return feedback_response(formatted_results, session_id)
     
     except Exception as e:
         print(f"Error in api_search: {str(e)}")
@@ -399,93 +563,180 @@ def api_search():
         return jsonify({"error": str(e)}), 500
     
     
-@app.route("/api/course", methods=["GET"])
-def get_similar_course():
+# Largest number of queries accepted by one /api/search/batch request
+BATCH_SEARCH_MAX_QUERIES = int(os.environ.get("BATCH_SEARCH_MAX_QUERIES", 1000))
+
+@app.route("/api/search/batch", methods=["POST"])
+def api_search_batch():
+    """
+    Runs many searches in one request. The body is {"queries": [...]} where each query is either a
+    string or {"q": ..., "relevant_ids": [...], "non_relevant_ids": [...]}. Returns one
+    {"q": ..., "results": [...]} per query, in order, with the same fields as /api/search.
+    """
     try:
-        print(request.args)
-        query_code = request.args.get('q', '').strip()
-        if not query_code:
-            return jsonify({"error": "Missing course code"}), 400
+        body = request.get_json(silent=True)
+        raw_queries = body.get("queries") if isinstance(body, dict) else None
+        if not isinstance(raw_queries, list):
+            return jsonify({"error": "Expected a JSON body with a 'queries' list"}), 400
+        if len(raw_queries) > BATCH_SEARCH_MAX_QUERIES:
+            return jsonify({"error": f"At most {BATCH_SEARCH_MAX_QUERIES} queries per batch"}), 413
+        if not courses_list:
+            return jsonify({"error": "No course data available. Please ensure the required data files are present."}), 500
 
-        if query_code not in course_codes:
-            return jsonify({"error": "Invalid course code"}), 404
+        queries = []
+        for item in raw_queries:
+            if isinstance(item, str):
+                item = {"q": item}
+            if not isinstance(item, dict) or not isinstance(item.get("q", ""), str):
+                return jsonify({"error": "Each query must be a string or an object with a string 'q'"}), 400
+            try:
+                relevant_ids = check_id_list(item.get("relevant_ids"))
+                non_relevant_ids = check_id_list(item.get("non_relevant_ids"))
+            except ValueError as e:
+                return jsonify({"error": f"Invalid feedback ids: {e}"}), 400
+            queries.append((item.get("q", ""), relevant_ids, non_relevant_ids))
 
-        import ast
-        relevant_ids = request.args.get('relevant_ids', None)
-        non_relevant_ids = request.args.get('non_relevant_ids', None)
+        keys = [result_cache_key("search", normalize_query(query), relevant_ids, non_relevant_ids)
+                for query, relevant_ids, non_relevant_ids in queries]
+        results = [[] if not query else search_result_cache.get(key) for key, (query, _, _) in zip(keys, queries)]
+        pending = [i for i, result in enumerate(results) if result is None]
+        print(f"API Batch Search: {len(queries)} queries, {len(pending)} not cached")
 
-        relevant_ids = ast.literal_eval(relevant_ids) if relevant_ids else []
-        non_relevant_ids = ast.literal_eval(non_relevant_ids) if non_relevant_ids else []
+        if pending:
+            for i, formatted_results in zip(pending, search_courses_batch([queries[i] for i in pending])):
+                search_result_cache.set(keys[i], formatted_results)
+                results[i] = formatted_results
 
-        course_idx = course_codes.index(query_code)
-        query_embedding = bert_embeddings[course_idx]
+        return jsonify([{"q": query, "results": result} for (query, _, _), result in zip(queries, results)])
+
+    except Exception as e:
+        print(f"Error in api_search_batch: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-       
-        if relevant_ids or non_relevant_ids:
-            print("Applying Rocchio adjustment based on feedback")
-            rel_indices = [course_codes.index(c) for c in relevant_ids if c in course_codes]
-            nonrel_indices = [course_codes.index(c) for c in non_relevant_ids if c in course_codes]
-            
-            relevant_vectors = [bert_embeddings[i] for i in rel_indices]
-            non_relevant_vectors = [bert_embeddings[i] for i in nonrel_indices]
-            
-            updated_query_vector = rocchio_update(query_embedding, relevant_vectors, non_relevant_vectors)
-            
-            similarities = cosine_similarity([updated_query_vector], bert_embeddings)[0]
-        else:
-            similarities = cosine_similarity([query_embedding], bert_embeddings)[0]
 
-        top_indices = similarities.argsort()[::-1][:20]  
+def similar_courses(query_code, relevant_ids, non_relevant_ids, feedback_vector=None):
+    """
+    The formatted /api/course results: the courses nearest to query_code, after Rocchio feedback.
+    """
+    query_embedding = embedding_index.vector(catalog.embedding_row(query_code))
+
+   
+    if neighbour_graphs["bert"] is not None:
+        neighbours = graph_neighbours(query_code, query_embedding, relevant_ids, non_relevant_ids, feedback_vector)
+    elif (relevant_ids or non_relevant_ids) and feedback_vector is not None:
+        print("Applying Rocchio adjustment from the feedback session")
+        neighbours = embedding_index.search(feedback_vector, 20)
+    elif relevant_ids or non_relevant_ids:
+        print("Applying Rocchio adjustment based on feedback")
+        rel_indices = catalog.embedding_rows(relevant_ids)
+        nonrel_indices = catalog.embedding_rows(non_relevant_ids)
+        
+        relevant_vectors = [embedding_index.vector(i) for i in rel_indices]
+        non_relevant_vectors = [embedding_index.vector(i) for i in nonrel_indices]
+        
+        updated_query_vector = rocchio_update(query_embedding, relevant_vectors, non_relevant_vectors)
+        
+        neighbours = embedding_index.search(updated_query_vector, 20)
+    else:
+        neighbours = embedding_index.search(query_embedding, 20)
+
+    course_row = catalog.row(query_code)
+    query_sentiment = catalog.sentiment[course_row]
+    base_results = [(score, i) for score, i in catalog.to_catalog_rows(neighbours) if i != course_row][:10]
+    rescored = adjust_scores_with_sentiment(query_sentiment, catalog.sentiment, base_results, alpha=0.3)
+
+    course = catalog[course_row]
+    course_title = course.get("course title") or course.get("title") or ""
+    result_codes = [catalog.codes[i] for _, i in rescored]
+    result_rows = [i for _, i in rescored]
+    # The course's own stored title embedding stands in for encoding its title again
+    title_row = embedding_index.title_rows.get(query_code)
+    if title_row is not None:
+        title_score_map = embedding_index.title_scores(embedding_index.title[title_row], result_codes)
+    else:
+        title_score_map = get_bert_title_similarity_scores(QueryAnalysis(course_title, encode_query_with_bert), result_codes)
+    description_topic_words = get_query_topic_words(QueryAnalysis(course.get("description", ""), encode_query_with_bert))
+    keyword_index = get_keyword_index()
+    if keyword_index is not None:
+        keyword_scores = dict(zip(result_rows, keyword_index.score_docs(course.get("description", ""), result_rows, tokenizer).tolist()))
+    else:
+        keyword_scores = dict.fromkeys(result_rows, 0.0)
 
-        top_indices = [i for i in top_indices if i != course_idx][:10]
+    formatted_results = []
+    seen_descriptions = set()
 
-        query_sentiment = course_sentiments.get(query_code, 0)
+    for sim_score, idx in sorted(rescored, key=lambda x: -x[0]):
+        course_data = catalog[idx]
+        description = course_data.get("description", "")
+        if description and description not in seen_descriptions:
+            seen_descriptions.add(description)
+            course_copy = course_data.copy()
+            if "description_tokens" in course_copy:
+                del course_copy["description_tokens"]
 
-        base_results = [(similarities[i], i) for i in top_indices]
-        rescored = adjust_bert_scores_with_sentiment(query_sentiment, course_sentiments, base_results, course_codes, alpha=0.3)
+            course_code = course_copy.get("course_code")
 
-        course = courses_list[course_idx]
-        course_title = course.get("course title") or course.get("title") or ""
-        title_score_map = get_bert_title_similarity_scores(course_title)
-        keyword_score_map = compute_keyword_scores(course.get("description", ""), inv_idx, idf, doc_norms, tokenizer, stop_words, punctuation)
+            course_copy["BERT_similarity_score"] = round(sim_score * 100, 0)
+            course_copy["sentiment_score"] = float(catalog.scaled_sentiment[idx])
 
-        formatted_results = []
-        seen_descriptions = set()
+            course_copy["keyword_score"] = round(float(keyword_scores[idx]) * 100, 0)
 
-        for sim_score, idx in sorted(rescored, key=lambda x: -x[0]):
-            if idx < len(courses_list):
-                course_data = courses_list[idx]
-                description = course_data.get("description", "")
-                if description and description not in seen_descriptions:
-                    seen_descriptions.add(description)
-                    course_copy = course_data.copy()
-                    if "description_tokens" in course_copy:
-                        del course_copy["description_tokens"]
+            course_copy["BERT_title_similarity_score"] = round(title_score_map.get(course_code, 0) * 100, 0)
 
-                    course_code = course_copy.get("course_code")
+            course_copy["svd_top_words"] = get_svd_matching_words(description_topic_words, idx)
 
-                    course_copy["BERT_similarity_score"] = round(sim_score * 100, 0)
-                    course_copy["sentiment_score"] = scaled_sentiments.get(course_code, 50)
+            course_copy.update(catalog.ratings(idx))
 
-                    idx_in_list = next((i for i, c in enumerate(courses_list) if c.get("course_code") == course_code), None)
-                    course_copy["keyword_score"] = round(keyword_score_map.get(idx_in_list, 0) * 100, 0)
+            formatted_results.append(course_copy)
 
-                    course_copy["BERT_title_similarity_score"] = round(title_score_map.get(course_code, 0) * 100, 0)
+    return formatted_results
 
-                    course_copy["svd_top_words"] = get_svd_matching_words(
-                        course.get("description", ""),
-                        course_copy.get("description", ""),
-                        vectorizer,
-                        svd,
-                        tokenizer
-                    )
 
-                    ratings = calculate_average_ratings(course_copy.get("reviews", []))
-                    course_copy.update(ratings)
+def graph_neighbours(query_code, query_embedding, relevant_ids, non_relevant_ids, feedback_vector=None, k=20):
+    """
+    The course's top-k (score, embedding_row) description neighbours from the precomputed graph.
+    With feedback, the Rocchio vector re-ranks only the stored BERT and keyword neighbours.
+    """
+    neighbours = neighbour_graphs["bert"].neighbours(catalog.embedding_row(query_code))
+    if not (relevant_ids or non_relevant_ids):
+        return neighbours[:k]
 
-                    formatted_results.append(course_copy)
+    print("Re-ranking stored neighbours with Rocchio feedback")
+    query_vector = feedback_vector if feedback_vector is not None else feedback_query_vector(query_embedding, relevant_ids, non_relevant_ids)
+    candidates = {i for _, i in neighbours}
+    if neighbour_graphs["keyword"] is not None:
+        keyword_neighbours = neighbour_graphs["keyword"].neighbours(catalog.row(query_code))
+        candidates.update(catalog.embedding_rows([catalog.codes[i] for _, i in keyword_neighbours]))
+    candidates = sorted(candidates)
+    scores = embedding_index.description_scores(query_vector, candidates)
+    return [(float(scores[j]), candidates[j]) for j in top_k_indices(scores, k)]
 
-        return jsonify(formatted_results)
+
+@app.route("/api/course", methods=["GET"])
+def get_similar_course():
+    try:
+        print(request.args)
+        query_code = request.args.get('q', '').strip()
+        if not query_code:
+            return jsonify({"error": "Missing course code"}), 400
+
+        course_idx = catalog.embedding_row(query_code)
+        if course_idx is None or query_code not in catalog:
+            return jsonify({"error": "Invalid course code"}), 404
+
+        try:
+            relevant_ids = parse_id_list(request.args.get('relevant_ids'))
+            non_relevant_ids = parse_id_list(request.args.get('non_relevant_ids'))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid feedback ids: {e}"}), 400
+
+        session_id, feedback_vector = open_feedback_session(
+            ("course", query_code), lambda: embedding_index.vector(course_idx), relevant_ids, non_relevant_ids)
+        key = result_cache_key("course", query_code, relevant_ids, non_relevant_ids)
+        formatted_results = search_result_cache.get_or_compute(
+            key, lambda: similar_courses(query_code, relevant_ids, non_relevant_ids, feedback_vector))
+        return feedback_response(formatted_results, session_id)
 
     except Exception as e:
         print(f"Error in get_similar_course: {e}")
@@ -498,23 +749,14 @@ def api_get_course(course_id):
     try:
         original_course_id = course_id.replace('-', ' ')
         
-        course_info = None
-        for course in courses_list:
-            if course.get("course_code") == original_course_id:
-                course_info = course
-                break
+        row = catalog.row(original_course_id)
         
-        if not course_info:
+        if row is None:
             return jsonify({"error": "Course not found"}), 404
             
-        if "description_tokens" in course_info:
-            course_info_clean = course_info.copy()
-            del course_info_clean["description_tokens"]
-        else:
-            course_info_clean = course_info
-            
-        ratings = calculate_average_ratings(course_info_clean.get("reviews", []))
-        course_info_clean.update(ratings)
+        course_info_clean = catalog[row].copy()
+        course_info_clean.pop("description_tokens", None)
+        course_info_clean.update(catalog.ratings(row))
         
         return jsonify(course_info_clean)
         
@@ -523,23 +765,56 @@ def api_get_course(course_id):
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     
-@app.route("/api/get_courses", methods=["GET"])
-def api_get_courses():
+# Serialized /api/get_courses bodies, keyed by catalog version, projected fields and page
+course_feed_cache = LRUCache(maxsize=64)
+
+def encode_cursor(course_code):
+    return base64.urlsafe_b64encode(course_code.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    """The catalog row a page starting after the cursor's course begins at"""
+    course_code = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    row = catalog.row(course_code)
+    if row is None:
+        raise ValueError(f"Unknown cursor {cursor}")
+    return row + 1
+
+def build_course_feed(fields, start, limit):
+    end = len(catalog) if limit is None else min(start + limit, len(catalog))
     final_courses = []
-    for course_info in courses_list:
-        if "description_tokens" in course_info:
+    for course_info in catalog.courses[start:end]:
+        if fields:
+            final_courses.append({field: course_info[field] for field in fields if field in course_info})
+        else:
             course_info_clean = course_info.copy()
-            del course_info_clean["description_tokens"]
+            course_info_clean.pop("description_tokens", None)
             final_courses.append(course_info_clean)
-        else:
-            final_courses.append(course_info)
 
     response = {
         "courses": final_courses,
         "keywords": []  
     }
+    if limit is not None:
+        response["next_cursor"] = encode_cursor(catalog.codes[end - 1]) if end < len(catalog) else None
+    return SerializedJSON(response)
+
+@app.route("/api/get_courses", methods=["GET"])
+def api_get_courses():
+    fields = tuple(f.strip() for f in request.args.get("fields", "").split(",") if f.strip() and f.strip() != "description_tokens")
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if limit is not None:
+        if not (limit.isascii() and limit.isdigit()) or int(limit) <= 0:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        limit = int(limit)
+    try:
+        start = decode_cursor(cursor) if cursor else 0
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
 
-    return jsonify(response)
+    key = (catalog.version, fields, start, limit)
+    serialized = course_feed_cache.get_or_compute(key, lambda: build_course_feed(fields, start, limit))
+    return serve_serialized(request, serialized)
 
 @app.route("/api/test")
 def api_test():
@@ -548,7 +823,37 @@ def api_test():
         "message": "API is working correctly",
         "search_available": search_function is not None,
         "courses_count": len(courses_list),
-        "index_size": len(inv_idx) if inv_idx else 0
+        # Liveness only: never triggers the lazy index build, so the size is None until it has been loaded
+        "index_size": len(keyword_indexes.get()["inv_idx"]) if keyword_indexes.loaded else None
+    })
+
+@app.route("/api/ready")
+def api_ready():
+    """
+    Readiness probe: 200 once every model and index is loaded, 503 before.
+
+    Only meaningful with MODEL_WARMUP=eager or background (gunicorn.conf.py uses eager). With the
+    lazy default nothing loads until requests need it, so a worker is reported not ready until then.
+    """
+    ready = all(component.loaded and component.error is None for component in warm_up_components)
+    return jsonify({
+        "ready": ready,
+        "warmup": MODEL_WARMUP,
+        "models": {component.name: component.status() for component in warm_up_components},
+        "startup": startup_timer.report(),
+    }), 200 if ready else 503
+
+@app.route("/api/stats")
+def api_stats():
+    return jsonify({
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "query_encoder": query_encoder.stats(),
+        "sentiment_batcher": sentiment_batcher.stats(),
+        "course_feed_cache": course_feed_cache.stats(),
+        "search_result_cache": search_result_cache.stats(),
+        "feedback_sessions": feedback_sessions.stats(),
+        "memory_mb": {"pid": os.getpid(), **process_memory()},
+        "startup": startup_timer.report(),
     })
 
 
@@ -570,16 +875,13 @@ def class_details(course_id):
         else:
             original_course_id = course_id.replace('-', ' ')
             
-            course_info = None
-            for course in courses_list:
-                if course.get("course_code") == original_course_id:
-                    course_info = course
-                    break
+            row = catalog.row(original_course_id)
             
-            if not course_info:
+            if row is None:
                 return render_template('class_details.html', error="Course not found", class_data=None)
             
-            ratings = calculate_average_ratings(course_info.get("reviews", []))
+            course_info = catalog[row]
+            ratings = catalog.ratings(row)
             
             class_data = {
                 'id': course_info.get('course_code'),
@@ -617,16 +919,53 @@ def rocchio_update(query_vector, relevant_vectors, non_relevant_vectors, alpha=1
     updated_query = alpha * query_vector + beta * relevant_centroid - gamma * non_relevant_centroid
     return updated_query
 
+# Running Rocchio state per feedback session, so each thumbs-up/down is an O(d) update
+feedback_sessions = FeedbackStore()
+
+def course_vector(course_code):
+    row = catalog.embedding_row(course_code)
+    return embedding_index.vector(row) if row is not None else None
+
+def open_feedback_session(key, query_vector, relevant_ids, non_relevant_ids):
+    """
+    The id of the request's feedback session (from its session_id parameter, or a new one) and
+    its Rocchio vector after syncing it to the given ids, or (None, None) when there is no
+    feedback to apply.
+    """
+    if embedding_index is None or not (relevant_ids or non_relevant_ids):
+        return None, None
+    session_id, session = feedback_sessions.open(request.args.get('session_id'), key, query_vector)
+    return session_id, session.sync(relevant_ids, non_relevant_ids, course_vector)
+
+def feedback_response(formatted_results, session_id):
+    response = jsonify(formatted_results)
+    if session_id:
+        response.headers["X-Feedback-Session"] = session_id
+    return response
+
+def feedback_query_vector(query_vector, relevant_ids, non_relevant_ids):
+    """The Rocchio-updated query vector for the feedback course codes, or query_vector when there is none"""
+    if not relevant_ids and not non_relevant_ids:
+        return query_vector
+    relevant_vectors = [embedding_index.vector(i) for i in catalog.embedding_rows(relevant_ids)]
+    non_relevant_vectors = [embedding_index.vector(i) for i in catalog.embedding_rows(non_relevant_ids)]
+    return rocchio_update(query_vector, relevant_vectors, non_relevant_vectors)
+
+# Queries from concurrent requests are encoded together in one model call
+query_encoder = MicroBatcher(lambda queries: query_model.get().encode(queries), name="query-encoder")
+
 def encode_query_with_bert(query):
-    return bert_model.encode([query])[0]  
+    return query_encoder(query)
 
 def bert_search_with_query_vector(query_vector, top_k=10):
-    similarities = cosine_similarity([query_vector], bert_embeddings)[0]
-    top_indices = similarities.argsort()[::-1][:top_k]
-    results = [(similarities[i], i) for i in top_indices]
-    return results
+    return embedding_index.search(query_vector, top_k)
 
     
+startup_timer.mark("routes")
+warm_up_components = [keyword_indexes, semantic_index, query_model, sentiment_model]
+warm_up(warm_up_components)
+startup_timer.mark("model warm-up")
+startup_timer.print_report()
 
 if __name__ == '__main__':
     if os.path.exists('/etc/hostname') and '4300showcase.infosci.cornell.edu' in open('/etc/hostname').read():
@@ -635,5 +974,9 @@ if __name__ == '__main__':
         port = int(os.environ.get('PORT', 5001))
     
     debug = os.environ.get('FLASK_DEBUG', 'False').lower() in ('true', '1', 't')
+    # Importing app stays lazy by default; the dev server warms up in the background unless told otherwise
+    if "MODEL_WARMUP" not in os.environ:
+        MODEL_WARMUP = "background"
+        warm_up(warm_up_components, MODEL_WARMUP)
     print(f"Starting Flask server on port {port} with debug={debug}")
     app.run(debug=debug, host="0.0.0.0", port=port)
\ No newline at end of file
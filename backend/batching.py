@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", 32))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", 5))
+# Longest a caller waits for its result; generous because the first call may load the model.
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", 60))
+
+
+class MicroBatcher:
+    """
+    Collects single-item inference calls from concurrent requests and runs them as one batch.
+
+    A background thread takes the first queued item, keeps collecting until `max_batch_size`
+    items are queued or `max_wait_ms` has passed, then calls `batch_fn(items)` once and
+    resolves each caller's future with its own result.
+
+    Args:
+        batch_fn (function): Maps a list of inputs to a list (or array) of outputs in the same order.
+        max_batch_size (int): The most items run through batch_fn at once.
+        max_wait_ms (float): How long the first item in a batch waits for others to arrive.
+        name (str): Used for the worker thread name and in stats().
+    """
+
+    def __init__(self, batch_fn, max_batch_size=INFERENCE_MAX_BATCH_SIZE, max_wait_ms=INFERENCE_MAX_WAIT_MS,
+                 name="batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a worker started in a preloading parent
+        # process is restarted the first time each child submits work.
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def submit(self, item):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=INFERENCE_TIMEOUT):
+        """
+        Raises:
+            concurrent.futures.TimeoutError: If the result is not ready within timeout seconds.
+        """
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                self._run_batch(batch)
+            except BaseException as e:
+                # Whatever went wrong, no caller is left waiting on an unresolved future, and the
+                # worker keeps serving later batches: callers queued behind this batch would
+                # otherwise wait on a dead thread.
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch):
+        items = [item for item, _ in batch]
+        results = self.batch_fn(items)
+        if len(results) != len(batch):
+            raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
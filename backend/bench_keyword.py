@@ -0,0 +1,89 @@
+"""
+Latency and result-overlap benchmark for the keyword rankers.
+
+    python bench_keyword.py [--k 10] [--queries 200]
+
+Compares similarity.search (dict TF-IDF), KeywordIndex (CSR TF-IDF), BM25 with MaxScore
+pruning, and exhaustive BM25 on queries sampled from course titles.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from bm25 import BM25Index
+from keyword_index import KeywordIndex, query_term_counts
+from similarity import build_inverted_index, compute_doc_norms, compute_idf, ensure_description_tokens, search
+from vector_index import top_k
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+COMMON_QUERIES = ["course", "students", "course students", "introduction to the course", "research methods"]
+
+
+def load_courses(path=os.path.join(base_path, "courses_w_tokens.json")):
+    with open(path, "r") as f:
+        courses = json.load(f)
+    ensure_description_tokens(courses)
+    return list(courses.values())
+
+
+def time_queries(fn, queries):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def overlap(a, b, k):
+    a, b = {doc for _, doc, *_ in a[:k]}, {doc for _, doc, *_ in b[:k]}
+    return len(a & b) / k if k else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    courses_list = load_courses()
+    inv_idx = build_inverted_index(courses_list)
+    idf = compute_idf(inv_idx, len(courses_list))
+    doc_norms = compute_doc_norms(inv_idx, idf, len(courses_list))
+    keyword_index = KeywordIndex(inv_idx, idf, doc_norms)
+    bm25_index = BM25Index(inv_idx, len(courses_list))
+
+    titles = [c.get("course title") or c.get("title") for c in courses_list]
+    titles = [t for t in titles if t]
+    random.seed(42)
+    queries = COMMON_QUERIES + random.sample(titles, min(args.queries, len(titles)))
+
+    def bm25_exhaustive(query):
+        scores = bm25_index.score_counts(query_term_counts(query))
+        return [(scores[i], int(i)) for i in top_k(scores, args.k) if scores[i] > 0]
+
+    rankers = {
+        "tfidf_dict": lambda q: search(q, inv_idx, idf, doc_norms)[:args.k],
+        "tfidf_csr": lambda q: keyword_index.search(q, args.k),
+        "bm25_maxscore": lambda q: bm25_index.search(q, args.k),
+        "bm25_exhaustive": bm25_exhaustive,
+    }
+    results = {}
+    print(f"{len(courses_list)} courses, {len(queries)} queries, k={args.k}")
+    for name, fn in rankers.items():
+        results[name], latencies = time_queries(fn, queries)
+        print(f"{name:>16}: mean {np.mean(latencies):7.3f} ms   p95 {np.percentile(latencies, 95):7.3f} ms")
+
+    pairs = [("tfidf_csr", "tfidf_dict"), ("bm25_maxscore", "bm25_exhaustive"), ("bm25_maxscore", "tfidf_dict")]
+    for a, b in pairs:
+        mean_overlap = np.mean([overlap(x, y, args.k) for x, y in zip(results[a], results[b])])
+        print(f"overlap@{args.k} {a} vs {b}: {mean_overlap:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import numpy as np
+
+from keyword_index import query_term_counts
+from similarity import PostingsIndex, flatten_inverted_index, tokenizer as default_tokenizer
+from vector_index import top_k
+
+# Postings are scanned in blocks so the bound checks and scoring stay vectorized.
+BLOCK_SIZE = 64
+
+
+class BM25Index:
+    """
+    BM25 ranking over impact-ordered posting lists with MaxScore early termination.
+
+    Each posting's BM25 contribution ("impact") is precomputed at build time. Every posting
+    list is stored twice: sorted by impact (for scanning, best postings first) and sorted by
+    doc id (for looking up a candidate's impact in each query term with a binary search).
+
+    Query terms are visited from the highest upper bound down. Once the upper bounds of the
+    remaining terms sum to no more than the current k-th best score, none of their documents
+    can enter the top-k and the search stops (MaxScore). Inside a list, scanning stops as soon
+    as a posting's impact plus the other terms' upper bounds cannot beat the k-th best score,
+    which is what cuts long lists for common terms like "course" or "students".
+
+    Args:
+        inv_idx (dict or PostingsIndex): The inverted index (term -> list of (doc_id, tf)).
+        n_docs (int): The number of documents.
+        k1 (float): BM25 term-frequency saturation.
+        b (float): BM25 length normalization.
+    """
+
+    def __init__(self, inv_idx, n_docs, k1=1.2, b=0.75):
+        if isinstance(inv_idx, PostingsIndex):
+            terms, offsets, docs, tfs = inv_idx.terms, inv_idx.offsets, inv_idx.docs, inv_idx.tfs
+        else:
+            terms, offsets, docs, tfs = flatten_inverted_index(inv_idx)
+        docs = np.asarray(docs, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float64)
+
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = np.asarray(offsets)
+        self.n_docs = n_docs
+        self.k1 = k1
+        self.b = b
+
+        df = np.diff(self.offsets)
+        posting_terms = np.repeat(np.arange(len(terms)), df)
+        doc_lengths = np.bincount(docs, weights=tfs, minlength=n_docs)
+        avg_length = doc_lengths.mean() if n_docs else 0
+        self.idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        length_norm = 1 - b + b * doc_lengths[docs] / avg_length if avg_length else np.ones(len(docs))
+        impacts = self.idf[posting_terms] * tfs * (k1 + 1) / (tfs + k1 * length_norm)
+
+        by_doc = np.lexsort((docs, posting_terms))
+        self.doc_docs = docs[by_doc]
+        self.doc_impacts = impacts[by_doc].astype(np.float32)
+
+        by_impact = np.lexsort((-impacts, posting_terms))
+        self.impact_docs = docs[by_impact]
+        self.impact_values = impacts[by_impact].astype(np.float32)
+
+        self.max_impact = np.zeros(len(terms), dtype=np.float32)
+        nonempty = df > 0
+        self.max_impact[nonempty] = self.impact_values[self.offsets[:-1][nonempty]]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _query_terms(self, term_counts):
+        ids = np.array([self.term_ids[term] for term in term_counts if term in self.term_ids], dtype=np.int64)
+        weights = np.array([term_counts[self.terms[i]] for i in ids], dtype=np.float64)
+        return ids, weights
+
+    def _score_docs(self, docs, ids, weights):
+        """Full BM25 score of each doc in docs, looking up each query term's impact by binary search."""
+        scores = np.zeros(len(docs))
+        for term_id, weight in zip(ids, weights):
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            postings = self.doc_docs[start:end]
+            positions = np.searchsorted(postings, docs)
+            found = positions < len(postings)
+            found[found] = postings[positions[found]] == docs[found]
+            scores[found] += weight * self.doc_impacts[start + positions[found]]
+        return scores
+
+    def score_counts(self, term_counts):
+        """
+        Exhaustive BM25 scores of every document, without pruning. Used as the reference for search().
+        """
+        ids, weights = self._query_terms(term_counts)
+        scores = np.zeros(self.n_docs)
+        for term_id, weight in zip(ids, weights):
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.doc_docs[start:end]] += weight * self.doc_impacts[start:end]
+        return scores
+
+    def search_counts(self, term_counts, k=10):
+        ids, weights = self._query_terms(term_counts)
+        if not len(ids):
+            return []
+
+        upper_bounds = weights * self.max_impact[ids]
+        order = np.argsort(-upper_bounds, kind="stable")
+        remaining_bounds = np.cumsum(upper_bounds[order][::-1])[::-1]
+        total_bound = upper_bounds.sum()
+
+        seen = np.zeros(self.n_docs, dtype=bool)
+        best_docs = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0)
+        threshold = 0.0
+
+        for rank, term_index in enumerate(order):
+            # MaxScore: documents found only in the remaining lists cannot reach the top-k.
+            if len(best_scores) == k and remaining_bounds[rank] <= threshold:
+                break
+
+            term_id, weight = ids[term_index], weights[term_index]
+            other_bounds = total_bound - upper_bounds[term_index]
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+
+            for block_start in range(start, end, BLOCK_SIZE):
+                block_end = min(block_start + BLOCK_SIZE, end)
+                bounds = weight * self.impact_values[block_start:block_end] + other_bounds
+                if len(best_scores) == k:
+                    keep = bounds > threshold
+                    if not keep[0]:
+                        break
+                else:
+                    keep = np.ones(len(bounds), dtype=bool)
+
+                docs = self.impact_docs[block_start:block_end][keep]
+                docs = docs[~seen[docs]]
+                if len(docs):
+                    seen[docs] = True
+                    best_docs = np.concatenate([best_docs, docs])
+                    best_scores = np.concatenate([best_scores, self._score_docs(docs, ids, weights)])
+                    kept = top_k(best_scores, k)
+                    best_docs, best_scores = best_docs[kept], best_scores[kept]
+                    if len(best_scores) == k:
+                        threshold = best_scores[-1]
+
+                if not keep[-1]:
+                    break
+
+        return [(float(score), int(doc)) for score, doc in zip(best_scores, best_docs) if score > 0]
+
+    def search(self, query, k=10, tokenizer=default_tokenizer):
+        return self.search_counts(query_term_counts(query, tokenizer), k)
+
+
+def search_bm25(query, index, k=10, tokenizer=default_tokenizer):
+    """
+    BM25 counterpart of similarity.search: top-k (score, doc_id) pairs for the query.
+    """
+    return index.search(query, k, tokenizer)
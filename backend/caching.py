@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by entry count and, optionally, by entry age.
+
+    Args:
+        maxsize (int): The maximum number of entries kept; the least recently used entry is evicted first.
+        ttl (float, optional): Seconds an entry stays valid after it was stored. None keeps entries until evicted.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, calling compute() and storing its result on a miss.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    LRU + TTL cache of JSON-serializable values in a SQLite file, so that every worker process
+    on the host reads and fills the same entries. Keys are any JSON-serializable value (tuples
+    are stored as lists). Hit and miss counters are per process; the size is the shared table's.
+
+    Args:
+        path (str): The SQLite database file; created if missing.
+        maxsize (int): The maximum number of entries kept; the least recently used are evicted first.
+        ttl (float, optional): Seconds an entry stays valid after it was stored. None keeps entries until evicted.
+    """
+
+    def __init__(self, path, maxsize=1024, ttl=None):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored REAL NOT NULL, used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (used)")
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads, or inherited across a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        key, now = self._key(key), time.time()
+        conn = self._connection()
+        row = conn.execute("SELECT value, stored FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            if count:
+                self.misses += 1
+            return default
+        conn.execute("UPDATE cache SET used = ? WHERE key = ?", (now, key))
+        if count:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, stored, used) VALUES (?, ?, ?, ?)",
+                     (self._key(key), json.dumps(value, separators=(",", ":")), now, now))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN "
+            "(SELECT key FROM cache ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, calling compute() and storing its result on a miss.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def source_fingerprint(paths):
+    """
+    A short hash of the size and modification time of each existing path, for versioning cache
+    entries by the files they were computed from without reading the files.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def make_result_cache(name, maxsize=1024, ttl=None, directory=None):
+    """
+    A SQLiteCache at <directory>/<name>.sqlite3 when directory is set (shared by every worker on
+    the host), otherwise an in-process LRUCache.
+    """
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        return SQLiteCache(os.path.join(directory, f"{name}.sqlite3"), maxsize=maxsize, ttl=ttl)
+    return LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+_MISSING = object()
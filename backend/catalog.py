@@ -0,0 +1,178 @@
+import numpy as np
+
+
+def calculate_average_ratings(reviews):
+    if not reviews:
+        return {
+            'avgDifficulty': 0,
+            'avgWorkload': 0,
+            'avgOverall': 0
+        }
+    
+    difficulty_sum = 0
+    difficulty_count = 0
+    workload_sum = 0
+    workload_count = 0
+    overall_sum = 0
+    overall_count = 0
+    
+    for review in reviews:
+        if 'difficulty' in review and review['difficulty'] != '-':
+            try:
+                difficulty_sum += int(review['difficulty'])
+                difficulty_count += 1
+            except (ValueError, TypeError):
+                pass
+        
+        if 'workload' in review and review['workload'] != '-':
+            try:
+                workload_sum += int(review['workload'])
+                workload_count += 1
+            except (ValueError, TypeError):
+                pass
+        
+        if 'overall' in review and review['overall'] != '-':
+            try:
+                overall_sum += int(review['overall'])
+                overall_count += 1
+            except (ValueError, TypeError):
+                pass
+    
+    return {
+        'avgDifficulty': difficulty_sum / difficulty_count if difficulty_count > 0 else 0,
+        'avgWorkload': workload_sum / workload_count if workload_count > 0 else 0,
+        'avgOverall': overall_sum / overall_count if overall_count > 0 else 0
+    }
+
+
+class CourseCatalog:
+    """
+    The course records in catalog row order, with O(1) lookups by course code.
+
+    The BERT embedding files have their own row order (only courses with a description or
+    title are encoded), so the catalog also keeps a verified alignment between each embedding
+    matrix and the catalog rows. Search results from an embedding index are in embedding rows
+    and must go through to_catalog_rows() before indexing the catalog.
+
+    Per-course rating averages, review counts and sentiment are precomputed by load_features()
+    into arrays in catalog row order; `version` is bumped whenever they change.
+
+    Args:
+        courses (list): The course dictionaries, each with a 'course_code' key.
+    """
+
+    def __init__(self, courses):
+        self.courses = courses
+        self.codes = [course.get("course_code") for course in courses]
+        self.rows = {code: row for row, code in enumerate(self.codes)}
+        if len(self.rows) != len(self.codes):
+            print(f"Warning: {len(self.codes) - len(self.rows)} duplicate course codes in the catalog")
+        self._embedding_rows = {}
+        self._catalog_rows = {}
+        self.version = 0
+
+        n = len(courses)
+        self.avg_difficulty = np.zeros(n)
+        self.avg_workload = np.zeros(n)
+        self.avg_overall = np.zeros(n)
+        self.review_count = np.zeros(n, dtype=np.int32)
+        self.sentiment = np.zeros(n)
+        self.scaled_sentiment = np.full(n, 50.0)
+
+    def __len__(self):
+        return len(self.courses)
+
+    def __iter__(self):
+        return iter(self.courses)
+
+    def __getitem__(self, row):
+        return self.courses[row]
+
+    def __contains__(self, code):
+        return code in self.rows
+
+    def row(self, code):
+        return self.rows.get(code)
+
+    def get(self, code):
+        row = self.rows.get(code)
+        return self.courses[row] if row is not None else None
+
+    def _refresh_ratings(self, row):
+        reviews = self.courses[row].get("reviews") or []
+        ratings = calculate_average_ratings(reviews)
+        self.avg_difficulty[row] = ratings['avgDifficulty']
+        self.avg_workload[row] = ratings['avgWorkload']
+        self.avg_overall[row] = ratings['avgOverall']
+        self.review_count[row] = len(reviews)
+
+    def load_features(self, course_sentiments, scaled_sentiments):
+        """
+        Parses every course's reviews once and stores the rating averages, review counts,
+        raw sentiment and scaled (0-100) sentiment in catalog row order.
+        """
+        for row in range(len(self.courses)):
+            self._refresh_ratings(row)
+        self.sentiment[:] = [course_sentiments.get(code, 0) for code in self.codes]
+        self.scaled_sentiment[:] = [scaled_sentiments.get(code, 50) for code in self.codes]
+        self.version += 1
+
+    def update_reviews(self, code, reviews, sentiment=None, scaled_sentiment=None):
+        """
+        Replaces one course's reviews (and optionally its sentiment) and recomputes its feature columns.
+        """
+        row = self.rows[code]
+        self.courses[row]["reviews"] = reviews
+        self._refresh_ratings(row)
+        if sentiment is not None:
+            self.sentiment[row] = sentiment
+        if scaled_sentiment is not None:
+            self.scaled_sentiment[row] = scaled_sentiment
+        self.version += 1
+
+    def ratings(self, row):
+        """The rating fields calculate_average_ratings would return for the course at row."""
+        return {
+            'avgDifficulty': float(self.avg_difficulty[row]),
+            'avgWorkload': float(self.avg_workload[row]),
+            'avgOverall': float(self.avg_overall[row]),
+        }
+
+    def align(self, name, embedding_codes):
+        """
+        Records the alignment between an embedding matrix (whose rows are embedding_codes) and the catalog.
+
+        Returns:
+            int: The number of embedding rows whose course is not in the catalog.
+        """
+        embedding_codes = list(embedding_codes)
+        self._embedding_rows[name] = {code: i for i, code in enumerate(embedding_codes)}
+        catalog_rows = np.array([self.rows.get(code, -1) for code in embedding_codes], dtype=np.int64)
+        self._catalog_rows[name] = catalog_rows
+
+        missing = int((catalog_rows < 0).sum())
+        if missing:
+            print(f"Warning: {missing} of {len(embedding_codes)} {name} embedding rows have no catalog course")
+        unembedded = len(self.courses) - int((catalog_rows >= 0).sum())
+        if unembedded:
+            print(f"{unembedded} catalog courses have no {name} embedding")
+        return missing
+
+    def embedding_row(self, code, name="description"):
+        return self._embedding_rows.get(name, {}).get(code)
+
+    def embedding_rows(self, codes, name="description"):
+        """Embedding rows of the given codes, skipping codes without an embedding."""
+        rows = self._embedding_rows.get(name, {})
+        return [rows[code] for code in codes if code in rows]
+
+    def to_catalog_row(self, embedding_row, name="description"):
+        row = int(self._catalog_rows[name][embedding_row])
+        return row if row >= 0 else None
+
+    def to_catalog_rows(self, results, name="description"):
+        """
+        Maps (score, embedding_row) search results to (score, catalog_row), dropping rows with no catalog course.
+        """
+        catalog_rows = self._catalog_rows[name]
+        return [(score, int(catalog_rows[i])) for score, i in results if catalog_rows[i] >= 0]
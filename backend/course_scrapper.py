@@ -1,34 +1,120 @@
-from bs4 import BeautifulSoup
-import requests
-import re
+"""
+Scrapes every class on a Cornell class roster into courses_info.json.
+
+Subjects are crawled concurrently on a thread pool that shares one pooled requests.Session.
+Requests to the same host are capped by a semaphore, and failed requests (connection errors,
+429 and 5xx) are retried with exponential backoff. Each subject's classes are appended to
+courses_info.jsonl as soon as the subject is done, and the subject is then recorded in the
+checkpoint. An interrupted crawl therefore resumes with only the subjects it has not finished.
+courses_info.json is rebuilt from the JSONL file at the end.
+
+    python course_scrapper.py [--term SP25] [--base-url https://classes.cornell.edu] [--workers 8]
+                              [--per-host 8] [--retries 5] [--output-dir .] [--fresh]
+
+--base-url can point at a local server serving saved roster pages, e.g.
+python -m http.server 8000 in a directory laid out like browse/roster/<term>/...
+"""
+import argparse
 import csv
 import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BASE_URL = "https://classes.cornell.edu"
+TERM = "SP25"
+REQUEST_TIMEOUT = 30
+
+
+def make_session(pool_size, retries=5, backoff=0.5):
+    """
+    A requests.Session whose connection pool holds pool_size connections per host and which
+    retries connection errors, 429 and 5xx responses with exponential backoff (honouring Retry-After).
+    """
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-url = "https://classes.cornell.edu/browse/roster/SP25"
-page = requests.get(url)
 
+class HostLimiter:
+    """
+    Caps the number of requests in flight to each host.
+    """
 
-soup = BeautifulSoup(page.text, "html.parser")
-sGroup = soup.find_all("ul", {"class": "subject-group"})
-codes = [subject.find("a").get_text() for subject in sGroup]
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
 
-url_prefix = "https://classes.cornell.edu"
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+
+class Fetcher:
+    """
+    GETs pages through a pooled session under the per-host limit and counts them.
+    """
+
+    def __init__(self, per_host=8, retries=5):
+        self.session = make_session(per_host, retries)
+        self.limit = HostLimiter(per_host)
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self.limit(url):
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        with self._lock:
+            self.pages += 1
+        return response.text
+
+
+def roster_url(base_url, term, *path):
+    return "/".join([base_url.rstrip("/"), "browse/roster", term, *path])
+
+
+def parse_subject_codes(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return [subject.find("a").get_text() for subject in soup.find_all("ul", {"class": "subject-group"})]
+
+
+def parse_subject_page(html):
+    """(class code, class title) for each class listed on a subject page"""
+    soup = BeautifulSoup(html, "html.parser")
+    classes = []
+    for lecture in soup.find_all("div", {"class": "node", "role": "region"}):
+        class_code = lecture.find("div", {"class": "title-subjectcode"}).get_text()
+        class_title = lecture.find("div", {"class": "title-coursedescr"}).get_text()
+        classes.append((class_code, class_title))
+    return classes
+
+
+def parse_class_page(html):
+    soup = BeautifulSoup(html, 'html.parser')
 
-subject_sites = {}
-for i in range(len(sGroup)):
-    code = codes[i]
-    subject_sites[code] = url_prefix + f"/browse/roster/SP25/subject/{code}"
-    
-def getClassData(url):
-    page = requests.get(url)
-    soup = BeautifulSoup(page.text, 'html.parser')
-    
     description = soup.find("p", {"class": "catalog-descr"})
     description = description.get_text().strip() if description else ""
-    
+
     term_offered = soup.find("span", {"class": "catalog-when-offered"})
     term_offered = term_offered.get_text()[13:-1].split(",") if term_offered else ""
-    
+
     distribution = soup.find("span", {"class": "catalog-distr"})
     distribution = distribution.get_text() if distribution else ""
     distribution_matches = re.findall(r'\((.*?)\)', distribution)
@@ -36,33 +122,119 @@ def getClassData(url):
 
     return {"description": description, "term_offered": term_offered, "distributions": distributions}
 
-data = {}
-def getCourse(course, subject_sites):
-    course_url = subject_sites.get(course)
-    course_page = requests.get(course_url)
-    
-    soup = BeautifulSoup(course_page.text, "html.parser")
-    lectures = soup.find_all("div", {"class": "node", "role": "region"})
-    
-    for lecture in lectures:
-        class_code = lecture.find("div", {"class": "title-subjectcode"}).get_text()
-        code_digit = class_code[-4:]
-        
-        class_title = lecture.find("div", {"class": "title-coursedescr"}).get_text()
-        
-        class_url = url_prefix + f"/browse/roster/SP25/class/{course}/{code_digit}"
 
-        class_data = getClassData(class_url)
+def scrape_subject(fetcher, base_url, term, subject):
+    """{class code: class data} for every class of one subject"""
+    data = {}
+    for class_code, class_title in parse_subject_page(fetcher.get(roster_url(base_url, term, "subject", subject))):
+        class_data = parse_class_page(fetcher.get(roster_url(base_url, term, "class", subject, class_code[-4:])))
         class_data["course title"] = class_title
-        
         data[class_code] = class_data
-    return
-        
+    return data
+
+
+class CrawlState:
+    """
+    The streamed JSONL output plus the checkpoint of finished subjects, both under output_dir.
+
+    A subject's records are appended and flushed before the subject is checkpointed, so a crash
+    in between only means the subject is crawled again; its duplicate records are collapsed
+    when courses_info.json is built.
+    """
+
+    def __init__(self, output_dir, term, fresh=False):
+        self.records_path = os.path.join(output_dir, "courses_info.jsonl")
+        self.checkpoint_path = os.path.join(output_dir, "course_scrapper_checkpoint.json")
+        self.term = term
+        self.done = set()
+        if fresh:
+            for path in (self.records_path, self.checkpoint_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        elif os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("term") != term:
+                raise SystemExit(f"{self.checkpoint_path} is for term {checkpoint.get('term')}, not {term}; "
+                                 f"pass --fresh to start over")
+            self.done = set(checkpoint["subjects"])
+        self._lock = threading.Lock()
+
+    def record(self, subject, data):
+        with self._lock:
+            with open(self.records_path, "a", encoding="utf-8") as f:
+                for class_code, class_data in data.items():
+                    f.write(json.dumps({"class": class_code, "subject": subject, **class_data}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done.add(subject)
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"term": self.term, "subjects": sorted(self.done)}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def records(self):
+        """{class code: class data}, in crawl order, with later records of a class replacing earlier ones"""
+        data = {}
+        if os.path.exists(self.records_path):
+            with open(self.records_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        record.pop("subject", None)
+                        data[record.pop("class")] = record
+        return data
+
+
+def crawl(term=TERM, base_url=BASE_URL, output_dir=".", workers=8, per_host=8, retries=5, fresh=False):
+    """
+    Crawls every subject not yet checkpointed and writes courses_info.json.
+
+    Returns:
+        list: The subjects that failed and will be retried on the next run.
+    """
+    start = time.perf_counter()
+    state = CrawlState(output_dir, term, fresh)
+    fetcher = Fetcher(per_host, retries)
+
+    subjects = parse_subject_codes(fetcher.get(roster_url(base_url, term)))
+    pending = [subject for subject in subjects if subject not in state.done]
+    print(f"{len(subjects)} subjects in {term}, {len(subjects) - len(pending)} already done, {len(pending)} to crawl")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(scrape_subject, fetcher, base_url, term, subject): subject for subject in pending}
+        for future in as_completed(futures):
+            subject = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"Failed to get data for {subject}: {e}")
+                failed.append(subject)
+                continue
+            state.record(subject, data)
+            print(f"Got {len(data)} classes for {subject} ({len(state.done)}/{len(subjects)})")
+
+    data = state.records()
+    output_path = os.path.join(output_dir, "courses_info.json")
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    print(f"Fetched {fetcher.pages} pages in {elapsed:.1f}s ({fetcher.pages / elapsed:.1f} pages/sec)")
+    print(f"Course info for {len(data)} classes saved to {output_path}")
+    if failed:
+        print(f"{len(failed)} subjects failed and will be retried on the next run: {', '.join(sorted(failed))}")
+    return failed
+
+
 def saveToCSV(data, filename="courses1.csv"):
     if not data:
         print("No data to save.")
         return
-    
+
     # Specify column order
     keys = ["class", "term_offered", "distributions", "description"]
 
@@ -70,7 +242,7 @@ def saveToCSV(data, filename="courses1.csv"):
     with open(filename, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.DictWriter(file, fieldnames=keys)
         writer.writeheader()
-        
+
         for row in data:
             # Convert lists to strings before writing
             row["term_offered"] = ", ".join(row["term_offered"])
@@ -78,12 +250,18 @@ def saveToCSV(data, filename="courses1.csv"):
             writer.writerow(row)
 
     print(f"Data saved to {filename}")
-    
 
-for subject, _ in subject_sites.items():
-    print("Getting data for ", subject)
-    getCourse(subject, subject_sites)
 
-with open("courses_info.json", "w") as f:
-    json.dump(data, f, indent= 4)
-print("Course info saved to courses_info.json")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--term", default=TERM, help="Roster term, e.g. SP25 or FA25")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=8, help="Most requests in flight to one host")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--fresh", action="store_true", help="Ignore the checkpoint and previous output")
+    args = parser.parse_args()
+
+    failed = crawl(args.term, args.base_url, args.output_dir, args.workers, args.per_host, args.retries, args.fresh)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,248 @@
+"""
+Builds the BERT description and title embeddings used by app.py and snapshot.py.
+
+Both are encoded in one model session. Every encoded text is kept in a content-hash cache
+(sha1 of model name + text), so a rebuild after a roster update only encodes the courses whose
+description or title is new or changed. Texts are sorted by length before batching so batches
+carry little padding, and --workers N splits the encoding across N processes.
+
+The outputs keep the (course_codes, embeddings) joblib format of the old generate_* scripts
+and are written atomically (temporary file + rename), followed by a manifest recording the
+counts, cache hits, timings and output hashes.
+
+    python embedding_builder.py [--only description|title] [--workers N] [--batch-size 64]
+
+Paths are resolved against this directory, like snapshot.SOURCE_FILES, which app.py loads the
+embeddings from.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+COURSES_PATH = os.path.join(base_path, "courses_w_tokens.json")
+CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", os.path.join(base_path, "embedding_cache"))
+MANIFEST_PATH = os.path.join(base_path, "embeddings_manifest.json")
+OUTPUTS = {
+    "description": os.path.join(base_path, "bert_embeddings.joblib"),
+    "title": os.path.join(base_path, "bert_title_embeddings.joblib"),
+}
+
+
+def course_texts(courses, kind):
+    """(course_codes, texts) for the courses that have a description or title, in catalog order."""
+    codes, texts = [], []
+    for code, data in courses.items():
+        text = data.get("description") if kind == "description" else (data.get("course title") or data.get("title"))
+        if text:
+            codes.append(code)
+            texts.append(text)
+    return codes, texts
+
+
+def text_hash(text, model_name=MODEL_NAME):
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path, write, mode="w"):
+    """Writes to a temporary file next to path with write(file) and renames it over path."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Text-hash -> embedding store: a float32 matrix (vectors.npy) and its row keys (keys.json).
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self.keys = []
+        self.vectors = None
+        keys_path, vectors_path = self._paths()
+        if os.path.exists(keys_path) and os.path.exists(vectors_path):
+            with open(keys_path, "r") as f:
+                self.keys = json.load(f)
+            self.vectors = np.load(vectors_path)
+            if len(self.keys) != len(self.vectors):
+                print("Embedding cache keys and vectors disagree, starting from an empty cache")
+                self.keys, self.vectors = [], None
+            elif not self.keys:
+                # An empty cache is saved as a (0, 0) array; None lets the first add() set the dimension.
+                self.vectors = None
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+
+    def _paths(self):
+        return os.path.join(self.directory, "keys.json"), os.path.join(self.directory, "vectors.npy")
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, keys):
+        return self.vectors[[self.rows[key] for key in keys]]
+
+    def add(self, keys, vectors):
+        new = [i for i, key in enumerate(keys) if key not in self.rows]
+        if not new:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)[new]
+        self.vectors = vectors if self.vectors is None or not len(self.vectors) else np.concatenate([self.vectors, vectors])
+        for i in new:
+            self.rows[keys[i]] = len(self.keys)
+            self.keys.append(keys[i])
+
+    def prune(self, keep):
+        """Drops every entry whose key is not in keep (texts no longer in the catalog)."""
+        rows = [self.rows[key] for key in self.keys if key in keep]
+        if len(rows) == len(self.keys):
+            return
+        self.keys = [self.keys[i] for i in rows]
+        self.vectors = self.vectors[rows] if rows else None
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        keys_path, vectors_path = self._paths()
+        vectors = self.vectors if self.vectors is not None else np.empty((0, 0), dtype=np.float32)
+        # Vectors first, keys last: a crash in between leaves a length mismatch, which is detected on load.
+        _atomic_write(vectors_path, lambda f: np.save(f, vectors), mode="wb")
+        _atomic_write(keys_path, lambda f: json.dump(self.keys, f))
+
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_chunk(args):
+    texts, batch_size = args
+    return _worker_model.encode(texts, batch_size=batch_size)
+
+
+def encode_texts(texts, model_name=MODEL_NAME, batch_size=64, workers=1):
+    """
+    Encodes texts sorted by length (so each batch pads to similar lengths) and returns the
+    embeddings in the original order. With workers > 1 the sorted texts are split into
+    contiguous chunks encoded by separate processes.
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i] for i in order]
+
+    if workers > 1:
+        chunk = -(-len(sorted_texts) // workers)
+        chunks = [(sorted_texts[i:i + chunk], batch_size) for i in range(0, len(sorted_texts), chunk)]
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_name, threads)) as pool:
+            encoded = np.concatenate(list(pool.map(_encode_chunk, chunks)))
+    else:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+        encoded = model.encode(sorted_texts, batch_size=batch_size, show_progress_bar=True)
+
+    embeddings = np.empty_like(encoded)
+    embeddings[order] = encoded
+    return embeddings
+
+
+def build_embeddings(kinds=("description", "title"), courses_path=COURSES_PATH, cache_dir=CACHE_DIR,
+                     model_name=MODEL_NAME, batch_size=64, workers=1):
+    """
+    Encodes the requested kinds of course text, reusing cached embeddings, and writes each
+    kind's (course_codes, embeddings) joblib file and the manifest.
+
+    Returns:
+        dict: The manifest.
+    """
+    start = time.perf_counter()
+    with open(courses_path, "r") as f:
+        courses = json.load(f)
+    cache = EmbeddingCache(cache_dir)
+
+    inputs = {kind: course_texts(courses, kind) for kind in kinds}
+    keys = {kind: [text_hash(text, model_name) for text in texts] for kind, (_, texts) in inputs.items()}
+
+    # Titles and descriptions share the cache, and one text is encoded once even if several courses use it.
+    missing = {}
+    for kind, (_, texts) in inputs.items():
+        for key, text in zip(keys[kind], texts):
+            if key not in cache:
+                missing.setdefault(key, text)
+    print(f"{sum(len(k) for k in keys.values())} texts, {len(missing)} to encode, {len(cache)} cached")
+
+    encode_start = time.perf_counter()
+    if missing:
+        cache.add(list(missing), encode_texts(list(missing.values()), model_name, batch_size, workers))
+    encode_seconds = time.perf_counter() - encode_start
+
+    manifest = {
+        "model": model_name,
+        "courses_sha256": _file_sha256(courses_path),
+        "encoded": len(missing),
+        "encode_seconds": round(encode_seconds, 3),
+        "texts_per_second": round(len(missing) / encode_seconds, 1) if missing and encode_seconds else None,
+        "outputs": {},
+    }
+    for kind, (codes, _) in inputs.items():
+        embeddings = cache.lookup(keys[kind]) if codes else np.empty((0, 0), dtype=np.float32)
+        path = OUTPUTS[kind]
+        _atomic_write(path, lambda f: joblib.dump((codes, embeddings), f), mode="wb")
+        manifest["outputs"][kind] = {
+            "path": os.path.basename(path),
+            "courses": len(codes),
+            "cache_hits": sum(1 for key in keys[kind] if key not in missing),
+            "sha256": _file_sha256(path),
+        }
+        print(f"Saved {len(codes)} {kind} embeddings to {path}")
+
+    if set(kinds) == set(OUTPUTS):
+        cache.prune({key for kind_keys in keys.values() for key in kind_keys})
+    cache.save()
+
+    manifest["total_seconds"] = round(time.perf_counter() - start, 3)
+    manifest["created"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    _atomic_write(MANIFEST_PATH, lambda f: json.dump(manifest, f, indent=2))
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", choices=sorted(OUTPUTS))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    kinds = (args.only,) if args.only else tuple(OUTPUTS)
+    manifest = build_embeddings(kinds, batch_size=args.batch_size, workers=args.workers)
+    print(json.dumps({key: manifest[key] for key in ("encoded", "encode_seconds", "texts_per_second", "total_seconds")}))
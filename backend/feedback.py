@@ -0,0 +1,166 @@
+"""
+Server-side relevance-feedback sessions for incremental Rocchio.
+
+A session remembers the query it was opened for, the query's embedding, and the sums of the
+relevant and non-relevant course vectors marked so far. Marking or unmarking one course adds
+or subtracts its vector from a sum, so each thumbs-up or thumbs-down is an O(d) update of the
+Rocchio vector instead of recomputing both centroids from every marked course.
+
+Sessions live in a bounded, expiring LRUCache in each process. The client still sends the full
+id lists with every request, so a request that reaches another worker, or arrives after its
+session expired, rebuilds the session from those lists and gets the same ranking.
+"""
+import json
+import os
+import secrets
+import threading
+
+import numpy as np
+
+from caching import LRUCache
+
+FEEDBACK_SESSION_MAX = int(os.environ.get("FEEDBACK_SESSION_MAX", 10000))
+FEEDBACK_SESSION_TTL = float(os.environ.get("FEEDBACK_SESSION_TTL", 1800))
+
+
+def parse_id_list(raw):
+    """
+    Parses a JSON array of course codes from a query parameter. Empty or missing means no ids.
+
+    Raises:
+        ValueError: If the value is not a JSON array of strings.
+    """
+    if not raw:
+        return []
+    return check_id_list(json.loads(raw))
+
+
+def check_id_list(ids):
+    """
+    Checks an already decoded id list (e.g. from a JSON body). None means no ids.
+
+    Raises:
+        ValueError: If the value is not a list of strings.
+    """
+    if ids is None:
+        return []
+    if not isinstance(ids, list) or not all(isinstance(course_id, str) for course_id in ids):
+        raise ValueError("Expected a JSON array of course codes")
+    return ids
+
+
+class FeedbackSession:
+    """
+    Running Rocchio state for one query.
+
+    Args:
+        key (tuple): What the session was opened for, e.g. ("search", normalized query).
+        query_vector (numpy.ndarray): The original query embedding.
+    """
+
+    def __init__(self, key, query_vector, alpha=1.0, beta=0.75, gamma=0.25):
+        self.key = key
+        self.query_vector = np.asarray(query_vector, dtype=np.float32)
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.relevant = {}
+        self.non_relevant = {}
+        self.relevant_sum = np.zeros_like(self.query_vector)
+        self.non_relevant_sum = np.zeros_like(self.query_vector)
+        self._vector = self.query_vector.copy()
+        self._lock = threading.Lock()
+
+    def _remove(self, code):
+        if code in self.relevant:
+            self.relevant_sum -= self.relevant.pop(code)
+        elif code in self.non_relevant:
+            self.non_relevant_sum -= self.non_relevant.pop(code)
+
+    def _add(self, code, vector, relevant):
+        if relevant:
+            self.relevant[code] = vector
+            self.relevant_sum += vector
+        else:
+            self.non_relevant[code] = vector
+            self.non_relevant_sum += vector
+
+    def sync(self, relevant_ids, non_relevant_ids, vector_for):
+        """
+        Applies only the differences between the session's marks and the given id lists, each
+        one an O(d) update. vector_for(code) returns a course's vector, or None for courses
+        without one (which are ignored, as in rocchio_update).
+
+        Returns:
+            numpy.ndarray: The Rocchio query vector for these marks, read under the same lock, so a
+                concurrent sync of other marks cannot change it before the caller searches with it.
+        """
+        with self._lock:
+            self._sync(relevant_ids, non_relevant_ids, vector_for)
+            return self._vector
+
+    def _sync(self, relevant_ids, non_relevant_ids, vector_for):
+        wanted = {code: False for code in non_relevant_ids}
+        wanted.update({code: True for code in relevant_ids})
+        current = {**{code: False for code in self.non_relevant}, **{code: True for code in self.relevant}}
+
+        changed = 0
+        for code in set(current) - set(wanted):
+            self._remove(code)
+            changed += 1
+        for code, relevant in wanted.items():
+            if current.get(code) is relevant:
+                continue
+            vector = vector_for(code)
+            if vector is None:
+                continue
+            self._remove(code)
+            self._add(code, vector, relevant)
+            changed += 1
+        if changed:
+            self._refresh()
+        return changed
+
+    def _refresh(self):
+        vector = self.alpha * self.query_vector
+        if self.relevant:
+            vector = vector + self.beta * self.relevant_sum / len(self.relevant)
+        if self.non_relevant:
+            vector = vector - self.gamma * self.non_relevant_sum / len(self.non_relevant)
+        self._vector = vector
+
+    def vector(self):
+        """The current Rocchio query vector; use the one returned by sync() to search with given marks."""
+        return self._vector
+
+
+class FeedbackStore:
+    """
+    Bounded, expiring map of session id -> FeedbackSession.
+    """
+
+    def __init__(self, maxsize=FEEDBACK_SESSION_MAX, ttl=FEEDBACK_SESSION_TTL):
+        self.sessions = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def open(self, session_id, key, query_vector):
+        """
+        The session with this id if it exists and was opened for `key`, otherwise a new session.
+
+        Args:
+            session_id (str or None): The id the client sent back, if any.
+            key (tuple): What the session is for; a session opened for another query is not reused.
+            query_vector (function): Returns the query embedding; only called for a new session.
+
+        Returns:
+            tuple: (session_id, FeedbackSession)
+        """
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None or session.key != key:
+            session_id = secrets.token_urlsafe(16)
+            session = FeedbackSession(key, query_vector())
+        # Re-setting refreshes the session's expiry on every use.
+        self.sessions.set(session_id, session)
+        return session_id, session
+
+    def stats(self):
+        return self.sessions.stats()
@@ -0,0 +1,76 @@
+"""
+Hybrid retrieval: merges the top-k candidates of several retrievers into one ranking.
+
+Each retriever (description BERT, title BERT, keyword TF-IDF/BM25) contributes its own
+top FUSION_DEPTH (score, catalog_row) list. The lists are fused either by reciprocal rank
+(score = sum of weight / (RRF_K + rank)), which ignores the retrievers' incomparable score
+scales, or by a weighted sum of each retriever's min-max normalized scores. A course found
+by only one retriever can still surface, and nothing outside the union of candidates is scored.
+"""
+import os
+
+SEARCH_FUSION = os.environ.get("SEARCH_FUSION", "rrf")
+FUSION_DEPTH = int(os.environ.get("FUSION_DEPTH", 50))
+RRF_K = int(os.environ.get("RRF_K", 60))
+DEFAULT_WEIGHTS = {"description": 1.0, "title": 0.5, "keyword": 1.0}
+
+
+def parse_weights(spec, default=DEFAULT_WEIGHTS):
+    """
+    Parses "description=1,title=0.5,keyword=1" into a dict, keeping the defaults for retrievers not listed.
+    """
+    weights = dict(default)
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            weights[name.strip()] = float(value)
+    return weights
+
+
+FUSION_WEIGHTS = parse_weights(os.environ.get("FUSION_WEIGHTS", ""))
+
+
+def _sorted(fused):
+    return sorted(((score, row) for row, score in fused.items()), key=lambda x: (-x[0], x[1]))
+
+
+def reciprocal_rank_fusion(rankings, weights=FUSION_WEIGHTS, k=RRF_K):
+    """
+    Args:
+        rankings (dict): Retriever name -> list of (score, row), best first.
+        weights (dict): Retriever name -> weight (1 when missing).
+        k (int): Damps the advantage of the very top ranks.
+
+    Returns:
+        list: (fused score, row) pairs, best first.
+    """
+    fused = {}
+    for name, results in rankings.items():
+        weight = weights.get(name, 1.0)
+        for rank, (_, row) in enumerate(results, start=1):
+            fused[row] = fused.get(row, 0.0) + weight / (k + rank)
+    return _sorted(fused)
+
+
+def weighted_score_fusion(rankings, weights=FUSION_WEIGHTS):
+    """
+    Weighted sum of each retriever's scores, min-max normalized over its own candidates.
+    A retriever that did not return a row contributes 0 for it.
+    """
+    fused = {}
+    for name, results in rankings.items():
+        if not results:
+            continue
+        weight = weights.get(name, 1.0)
+        scores = [score for score, _ in results]
+        low, high = min(scores), max(scores)
+        span = high - low
+        for score, row in results:
+            fused[row] = fused.get(row, 0.0) + weight * ((score - low) / span if span else 1.0)
+    return _sorted(fused)
+
+
+def fuse(rankings, method=SEARCH_FUSION, weights=FUSION_WEIGHTS):
+    if method == "weighted":
+        return weighted_score_fusion(rankings, weights)
+    return reciprocal_rank_fusion(rankings, weights)
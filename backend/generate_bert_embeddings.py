@@ -1,27 +1,11 @@
-from sentence_transformers import SentenceTransformer
-import numpy as np
-import json
-import joblib
+"""
+Writes bert_embeddings.joblib, (course_codes, embeddings) for every course with a description.
 
-# Load your course data
-with open("courses_w_tokens.json") as f:
-    courses = json.load(f)
+Kept for existing workflows; the work is done by embedding_builder.py, which only re-encodes
+descriptions that changed since the last build. Run python embedding_builder.py to build the
+description and title embeddings together.
+"""
+from embedding_builder import build_embeddings
 
-# Prepare descriptions
-descriptions = []
-course_codes = []
-
-for code, data in courses.items():
-    if "description" in data and data["description"]:
-        descriptions.append(data["description"])
-        course_codes.append(code)
-
-# Load Sentence-BERT model
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-# Encode all descriptions
-embeddings = model.encode(descriptions, show_progress_bar=True)
-
-# Save as compressed file
-joblib.dump((course_codes, embeddings), "bert_embeddings.joblib")
-print("Saved BERT embeddings to file.")
\ No newline at end of file
+if __name__ == "__main__":
+    build_embeddings(kinds=("description",))
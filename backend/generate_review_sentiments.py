@@ -1,33 +1,167 @@
+"""
+Scores every review comment with the sentiment classifier and writes, in one pass:
+
+- review_sentiments.json: each course's mean signed score (POSITIVE score, or minus the
+  NEGATIVE score; 0.0 for courses without comments),
+- scaled_sentiment_scores.json: the same means mapped to 0-100 by transform_scores.scale_review_score.
+
+Each comment's signed score is cached in review_sentiment_cache.json under the sha1 of the
+inference backend, the model name and the (truncated) comment, so a re-run after new reviews
+are scraped only classifies the new comments, and scores from the int8 ONNX model are never
+mixed with PyTorch ones when INFERENCE_BACKEND changes. Uncached comments are deduplicated, sorted by length and
+classified in batches of similar length; --workers N splits the batches across N processes.
+
+    python generate_review_sentiments.py [--workers N] [--batch-size 32]
+"""
+import argparse
+import hashlib
 import json
 import os
-from transformers import pipeline
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from onnx_inference import INFERENCE_BACKEND
+from sentiment_utils import SENTIMENT_MODEL, load_sentiment_pipeline, sentiment_model
+from transform_scores import scale_review_score
 
 base_path = os.path.dirname(os.path.abspath(__file__))
 reviews_path = os.path.join(base_path, 'course_reviews.json')
 output_path = os.path.join(base_path, 'review_sentiments.json')
+scaled_output_path = os.path.join(base_path, 'scaled_sentiment_scores.json')
+cache_path = os.path.join(base_path, 'review_sentiment_cache.json')
+
+MAX_COMMENT_CHARS = 512
+# The cache is written every this many newly scored comments, so an interrupted run keeps its progress.
+CHECKPOINT_EVERY = 1000
+
+
+def comment_text(review):
+    return review.get("comment", "").strip()[:MAX_COMMENT_CHARS]
+
+
+def comment_hash(text, model_name=SENTIMENT_MODEL, backend=INFERENCE_BACKEND):
+    return hashlib.sha1(f"{backend}\0{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+def signed_score(result):
+    return result["score"] if result["label"] == "POSITIVE" else -result["score"]
+
+
+def _write_json(path, data, indent=None):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        print(f"Ignoring unreadable sentiment cache {path}")
+        return {}
+
 
-with open(reviews_path, 'r') as f:
-    course_reviews = json.load(f)
+def length_buckets(texts, batch_size):
+    """Batches of texts sorted by length, so each batch pads to similar lengths."""
+    ordered = sorted(texts, key=len)
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
 
-classifier = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
 
-course_sentiments = {}
+_worker_classifier = None
 
-for course_code, reviews in course_reviews.items():
-    scores = []
-    for review in reviews:
-        text = review.get("comment", "").strip()
-        if text:
-            result = classifier(text[:512])[0]  # limit to 512 tokens
-            score = result["score"] if result["label"] == "POSITIVE" else -result["score"]
-            scores.append(score)
-    if scores:
-        avg_score = sum(scores) / len(scores)
+
+def _init_worker(threads):
+    global _worker_classifier
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_classifier = load_sentiment_pipeline()
+
+
+def _score_batch(texts):
+    results = _worker_classifier(texts, batch_size=len(texts))
+    return [signed_score(result) for result in results]
+
+
+def score_comments(texts, cache, batch_size=32, workers=1):
+    """
+    Classifies texts (none of them in the cache yet) and adds their signed scores to the cache,
+    checkpointing it every CHECKPOINT_EVERY comments. Yields the number scored at each checkpoint.
+    """
+    batches = length_buckets(texts, batch_size)
+    if workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,))
+        scored_batches = pool.map(_score_batch, batches)
     else:
-        avg_score = 0.0
-    course_sentiments[course_code] = avg_score
+        pool = None
+        classifier = sentiment_model.get()
+        scored_batches = ([signed_score(r) for r in classifier(batch, batch_size=len(batch))] for batch in batches)
+
+    try:
+        since_checkpoint = 0
+        for batch, scores in zip(batches, scored_batches):
+            for text, score in zip(batch, scores):
+                cache[comment_hash(text)] = score
+            since_checkpoint += len(batch)
+            if since_checkpoint >= CHECKPOINT_EVERY:
+                _write_json(cache_path, cache)
+                yield since_checkpoint
+                since_checkpoint = 0
+        if since_checkpoint:
+            _write_json(cache_path, cache)
+            yield since_checkpoint
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def course_sentiments(course_reviews, cache):
+    """Each course's mean signed comment score, 0.0 for courses without comments."""
+    sentiments = {}
+    for course_code, reviews in course_reviews.items():
+        scores = [cache[comment_hash(text)] for text in map(comment_text, reviews) if text]
+        sentiments[course_code] = sum(scores) / len(scores) if scores else 0.0
+    return sentiments
+
+
+def generate(batch_size=32, workers=1):
+    with open(reviews_path, 'r') as f:
+        course_reviews = json.load(f)
+    cache = load_cache(cache_path)
+
+    texts = {text for reviews in course_reviews.values() for text in map(comment_text, reviews) if text}
+    missing = [text for text in texts if comment_hash(text) not in cache]
+    print(f"{len(texts)} distinct comments, {len(texts) - len(missing)} cached, {len(missing)} to score")
+
+    start = time.perf_counter()
+    done = 0
+    for scored in score_comments(missing, cache, batch_size, workers):
+        done += scored
+        elapsed = time.perf_counter() - start
+        print(f"{done}/{len(missing)} comments, {done / elapsed:.1f} reviews/sec")
+    elapsed = time.perf_counter() - start
+
+    sentiments = course_sentiments(course_reviews, cache)
+    _write_json(output_path, sentiments, indent=2)
+    _write_json(scaled_output_path, {course: scale_review_score(score) for course, score in sentiments.items()},
+                indent=2)
+
+    rate = f"{len(missing) / elapsed:.1f} reviews/sec" if missing and elapsed else "nothing to score"
+    print(f"Scored {len(missing)} comments in {elapsed:.1f}s ({rate})")
+    print(f"Saved transformer-based sentiment scores to {output_path} and {scaled_output_path}")
+
 
-with open(output_path, 'w') as f:
-    json.dump(course_sentiments, f, indent=2)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
 
-print(f"Saved transformer-based sentiment scores to {output_path}")
\ No newline at end of file
+    generate(args.batch_size, args.workers)
@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for serving app.py with many workers per node.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is imported once in the master (preload_app), so the SentenceTransformer, the
+sentiment pipeline, the embeddings and the search indexes are loaded before forking and
+shared copy-on-write by every worker. The search snapshot arrays are mmapped, so they are
+shared through the page cache as well. Each worker then gets its own small torch thread pool
+so that N workers do not each start one thread per core.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', 5001)}")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# Threads let concurrent requests in one worker share MicroBatcher batches.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+preload_app = True
+# Load the models in the master while preloading, so the workers share them.
+os.environ.setdefault("MODEL_WARMUP", "eager")
+
+# Torch intra-op threads per worker. Defaults to an even share of the cores.
+TORCH_THREADS_PER_WORKER = int(os.environ.get("TORCH_THREADS_PER_WORKER", max(1, multiprocessing.cpu_count() // workers)))
+# Same budget for ONNX Runtime sessions (INFERENCE_BACKEND=onnx), which each worker creates on first use.
+os.environ.setdefault("ONNX_INTRA_OP_THREADS", str(TORCH_THREADS_PER_WORKER))
+
+
+def when_ready(server):
+    # Everything allocated while preloading lives as long as the app. Moving it to the permanent
+    # generation keeps the workers' garbage collections from writing to (and so copying) those pages.
+    gc.collect()
+    gc.freeze()
+    server.log.info("Preloaded app; froze %d objects for copy-on-write sharing", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    try:
+        import torch
+        torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+    except ImportError:
+        pass
+    server.log.info("Worker %s using %d torch threads", worker.pid, TORCH_THREADS_PER_WORKER)
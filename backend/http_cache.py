@@ -0,0 +1,60 @@
+import gzip
+import hashlib
+import json
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class SerializedJSON:
+    """
+    A JSON body serialized once, with its ETag and compressed variants computed up front,
+    so serving it is a dict lookup instead of a json.dumps per request.
+    """
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=6)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=5)
+
+    def __len__(self):
+        return len(self.body)
+
+
+def _accepted_encoding(accept_encoding, available):
+    accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in available:
+            return encoding
+    return None
+
+
+def serve_serialized(request, serialized, max_age=300):
+    """
+    Responds with a SerializedJSON body: 304 when If-None-Match matches the ETag, otherwise the
+    best encoding the client accepts (brotli, then gzip, then identity).
+
+    Each encoding is a different representation, so each gets its own ETag ("<sha1>-gzip",
+    "<sha1>-br"); a cache can never answer one encoding's request with another's body.
+    """
+    encoding = _accepted_encoding(request.headers.get("Accept-Encoding"), serialized.encoded)
+    etag = f"{serialized.etag}-{encoding}" if encoding else serialized.etag
+    headers = {
+        "ETag": f'"{etag}"',
+        "Vary": "Accept-Encoding",
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    body = serialized.body
+    if encoding:
+        body = serialized.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype="application/json", headers=headers)
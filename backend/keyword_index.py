@@ -0,0 +1,128 @@
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from similarity import PostingsIndex, flatten_inverted_index, punctuation, stop_words, tokenizer as default_tokenizer
+from vector_index import top_k
+
+
+def query_term_counts(query, tokenizer=default_tokenizer):
+    """
+    Tokenizes a query the same way similarity.search does and counts each kept token.
+    """
+    tokens = tokenizer.tokenize(query.lower())
+    return Counter(t for t in tokens if t.lower() not in stop_words and t not in punctuation)
+
+
+class KeywordIndex:
+    """
+    TF-IDF cosine scoring over a CSR term-document matrix.
+
+    Row t of `matrix` holds tf * idf[t] / doc_norm for every document containing term t,
+    so a query's cosine scores are one sparse row-gather and a weighted sum:
+    scores = matrix[query_terms].T @ (query_tf * idf / query_norm).
+    The scores match similarity.search, without building per-document dicts.
+
+    Args:
+        inv_idx (dict or PostingsIndex): The inverted index (term -> list of (doc_id, tf)).
+        idf (dict): The idf value of each term.
+        doc_norms (numpy.ndarray): The document norms from compute_doc_norms.
+    """
+
+    def __init__(self, inv_idx, idf, doc_norms):
+        if isinstance(inv_idx, PostingsIndex):
+            terms, offsets, docs, tfs = inv_idx.terms, inv_idx.offsets, inv_idx.docs, inv_idx.tfs
+        else:
+            terms, offsets, docs, tfs = flatten_inverted_index(inv_idx)
+
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.idf = np.array([idf.get(term, 0) for term in terms], dtype=np.float64)
+        self.doc_norms = np.asarray(doc_norms, dtype=np.float64)
+        self.n_docs = len(self.doc_norms)
+
+        inv_norms = np.zeros(self.n_docs)
+        np.divide(1.0, self.doc_norms, out=inv_norms, where=self.doc_norms > 0)
+        posting_terms = np.repeat(np.arange(len(terms)), np.diff(offsets))
+        values = np.asarray(tfs, dtype=np.float64) * self.idf[posting_terms] * inv_norms[docs]
+        self.matrix = sparse.csr_matrix((values, docs, offsets), shape=(len(terms), self.n_docs))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _query_weights(self, term_counts):
+        ids = [self.term_ids[term] for term in term_counts if term in self.term_ids]
+        weights = np.array([term_counts[self.terms[i]] for i in ids], dtype=np.float64) * self.idf[ids]
+        # Query terms missing from the index have idf 0 and do not add to the norm.
+        q_norm = np.sqrt(np.sum(weights ** 2))
+        return ids, weights, q_norm
+
+    def score_counts(self, term_counts):
+        """
+        Returns:
+            numpy.ndarray: The cosine score of every document (0 for documents sharing no term).
+        """
+        ids, weights, q_norm = self._query_weights(term_counts)
+        if not ids or not q_norm:
+            return np.zeros(self.n_docs)
+        return self.matrix[ids].T @ (weights / q_norm)
+
+    def score(self, query, tokenizer=default_tokenizer):
+        return self.score_counts(query_term_counts(query, tokenizer))
+
+    def score_docs(self, query, doc_ids, tokenizer=default_tokenizer):
+        """
+        score() for the documents in doc_ids only, without scoring the rest of the collection.
+        """
+        ids, weights, q_norm = self._query_weights(query_term_counts(query, tokenizer))
+        if not ids or not q_norm or not len(doc_ids):
+            return np.zeros(len(doc_ids))
+        return self.matrix[ids][:, list(doc_ids)].T @ (weights / q_norm)
+
+    def score_many(self, queries, tokenizer=default_tokenizer):
+        """
+        Scores of every document for each query, as one sparse (queries x terms) @ (terms x docs) product.
+
+        Returns:
+            numpy.ndarray: A (len(queries), n_docs) array whose rows match score() for each query.
+        """
+        rows, cols, values = [], [], []
+        for row, query in enumerate(queries):
+            ids, weights, q_norm = self._query_weights(query_term_counts(query, tokenizer))
+            if ids and q_norm:
+                rows.extend([row] * len(ids))
+                cols.extend(ids)
+                values.extend(weights / q_norm)
+        query_matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(queries), len(self.terms)))
+        return (query_matrix @ self.matrix).toarray()
+
+    def explain(self, term_counts, doc_ids, n=5):
+        """
+        The top contributing (term, contribution) pairs for each document in doc_ids, as in
+        similarity.accumulate_dot_scores. Only computed for the documents asked for.
+        """
+        ids, weights, _ = self._query_weights(term_counts)
+        if not ids:
+            return [[] for _ in doc_ids]
+        doc_ids = list(doc_ids)
+        # Undo the doc norm division to get the raw query_tf * doc_tf * idf^2 products.
+        block = self.matrix[ids][:, doc_ids].toarray() * weights[:, None] * self.doc_norms[doc_ids]
+        explanations = []
+        for column in block.T:
+            order = [i for i in np.argsort(-column, kind="stable") if column[i] != 0][:n]
+            explanations.append([(self.terms[ids[i]], column[i]) for i in order])
+        return explanations
+
+    def search(self, query, k=10, explain=False, tokenizer=default_tokenizer):
+        """
+        Top-k documents by keyword score as (score, doc_id) pairs, or (score, doc_id, contributions)
+        triples when explain is True.
+        """
+        term_counts = query_term_counts(query, tokenizer)
+        scores = self.score_counts(term_counts)
+        best = [i for i in top_k(scores, k) if scores[i] != 0]
+        if not explain:
+            return [(scores[i], int(i)) for i in best]
+        explanations = self.explain(term_counts, best)
+        return [(scores[i], int(i), contributions) for i, contributions in zip(best, explanations)]
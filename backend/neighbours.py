@@ -0,0 +1,185 @@
+"""
+Precomputed top-K course neighbour graphs for /api/course.
+
+The course catalog only changes once per roster, so "the courses most similar to X" is
+computed offline for every course at once instead of per click:
+
+- the BERT graph ranks description embeddings by cosine similarity (rows are embedding rows),
+- the keyword graph ranks TF-IDF document vectors by cosine similarity (rows are catalog rows).
+
+All pairs are scored with blocked matrix multiplication (a block of rows against every row),
+blocks run on a thread pool since BLAS and argpartition release the GIL, and only each row's
+top K survive. Blocks shrink as the catalog grows so that one block holds at most
+NEIGHBOUR_BLOCK_ENTRIES similarities, and the keyword product stays sparse, ranking only each
+row's stored entries, so peak memory stays bounded. A graph is two (n, K) arrays, neighbour ids (int32, -1 padded) and scores
+(float32), saved as .npy files that load mmapped.
+
+Built as part of snapshot.py, or for an existing snapshot with:
+
+    python neighbours.py [snapshot_dir] [--k 100]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from vector_index import normalize_rows, top_k
+
+NEIGHBOUR_K = int(os.environ.get("NEIGHBOUR_K", 100))
+# Most similarities scored at once by one block (a block of rows times n), and most blocks in flight
+NEIGHBOUR_BLOCK_ENTRIES = int(os.environ.get("NEIGHBOUR_BLOCK_ENTRIES", 1 << 22))
+NEIGHBOUR_MAX_JOBS = int(os.environ.get("NEIGHBOUR_MAX_JOBS", 8))
+MAX_BLOCK_ROWS = 1024
+GRAPH_NAMES = ("bert", "keyword")
+
+
+class NeighbourGraph:
+    """
+    The top-K neighbours of every row, best first.
+
+    Args:
+        ids (numpy.ndarray): (n, K) neighbour rows, -1 where a row has fewer than K neighbours.
+        scores (numpy.ndarray): (n, K) cosine similarities matching ids.
+    """
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def neighbours(self, row, k=None):
+        """(score, row) pairs for the row's neighbours, best first."""
+        ids, scores = self.ids[row, :k], self.scores[row, :k]
+        valid = ids >= 0
+        return list(zip(scores[valid].tolist(), ids[valid].tolist()))
+
+    def save(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, f"{name}_neighbour_ids.npy"), self.ids)
+        np.save(os.path.join(directory, f"{name}_neighbour_scores.npy"), self.scores)
+
+    @classmethod
+    def load(cls, directory, name, mmap=True):
+        paths = [os.path.join(directory, f"{name}_neighbour_{part}.npy") for part in ("ids", "scores")]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        return cls(*(np.load(path, mmap_mode="r" if mmap else None) for path in paths))
+
+
+def _block_top_k(similarities, start, k):
+    """Top k columns of each row of a (block, n) similarity block, excluding each row's own column."""
+    rows = np.arange(len(similarities))
+    similarities[rows, start + rows] = -np.inf
+    k = min(k, similarities.shape[1] - 1)
+    if k <= 0:
+        return np.empty((len(similarities), 0), dtype=np.int32), np.empty((len(similarities), 0), dtype=np.float32)
+    candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return (np.take_along_axis(candidates, order, axis=1).astype(np.int32),
+            np.take_along_axis(candidate_scores, order, axis=1).astype(np.float32))
+
+
+def _sparse_block_top_k(similarities, start, k):
+    """
+    Top k columns of each row of a sparse (block, n) CSR similarity block, excluding each row's
+    own column and columns without a positive score. Only a row's stored entries are ranked, so
+    the block is never densified; rows with fewer than k such columns are padded with -1.
+    """
+    ids = np.full((similarities.shape[0], k), -1, dtype=np.int32)
+    scores = np.zeros((similarities.shape[0], k), dtype=np.float32)
+    for i in range(similarities.shape[0]):
+        lo, hi = similarities.indptr[i], similarities.indptr[i + 1]
+        columns, data = similarities.indices[lo:hi], similarities.data[lo:hi]
+        kept = (columns != start + i) & (data > 0)
+        columns, data = columns[kept], data[kept]
+        best = top_k(data, k)
+        ids[i, :len(best)] = columns[best]
+        scores[i, :len(best)] = data[best]
+    return ids, scores
+
+
+def block_rows(n, block_size=None):
+    """Rows per block: block_size if given, else as many as fit NEIGHBOUR_BLOCK_ENTRIES, up to MAX_BLOCK_ROWS."""
+    return block_size or max(1, min(MAX_BLOCK_ROWS, NEIGHBOUR_BLOCK_ENTRIES // max(n, 1)))
+
+
+def _build_graph(n, k, block_top_k, block_size, n_jobs):
+    """block_top_k(start, end, k) returns the (ids, scores) of rows start:end."""
+    k = min(k, max(n - 1, 0))
+    ids = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    block_size = block_rows(n, block_size)
+
+    def run(start):
+        end = min(start + block_size, n)
+        ids[start:end], scores[start:end] = block_top_k(start, end, k)
+
+    with ThreadPoolExecutor(max_workers=n_jobs or min(os.cpu_count() or 1, NEIGHBOUR_MAX_JOBS)) as pool:
+        list(pool.map(run, range(0, n, block_size)))
+    return NeighbourGraph(ids, scores)
+
+
+def build_dense_graph(vectors, k=NEIGHBOUR_K, block_size=None, n_jobs=None):
+    """
+    Top-k cosine neighbours of every row of a dense embedding matrix.
+    """
+    vectors = normalize_rows(vectors)
+    return _build_graph(len(vectors), k, lambda start, end, k: _block_top_k(vectors[start:end] @ vectors.T, start, k),
+                        block_size, n_jobs)
+
+
+def build_keyword_graph(keyword_index, k=NEIGHBOUR_K, block_size=None, n_jobs=None):
+    """
+    Top-k TF-IDF cosine neighbours of every document of a KeywordIndex. Documents sharing no
+    term with a row are not neighbours (their ids stay -1).
+    """
+    # Columns of keyword_index.matrix are unit-length tf-idf document vectors.
+    documents = keyword_index.matrix.T.tocsr()
+    return _build_graph(documents.shape[0], k,
+                        lambda start, end, k: _sparse_block_top_k(documents[start:end] @ documents.T, start, k),
+                        block_size, n_jobs)
+
+
+def build_neighbour_graphs(directory, embeddings, keyword_index, k=NEIGHBOUR_K):
+    """
+    Builds and saves both graphs into directory and returns their build timings in seconds.
+    """
+    timings = {}
+    for name, build in (("bert", lambda: build_dense_graph(embeddings, k)),
+                        ("keyword", lambda: build_keyword_graph(keyword_index, k))):
+        start = time.perf_counter()
+        build().save(directory, name)
+        timings[f"{name}_neighbours"] = time.perf_counter() - start
+    return timings
+
+
+def load_neighbour_graphs(directory, mmap=True):
+    """dict of graph name -> NeighbourGraph (or None when that graph has not been built)"""
+    return {name: NeighbourGraph.load(directory, name, mmap=mmap) for name in GRAPH_NAMES}
+
+
+if __name__ == "__main__":
+    from keyword_index import KeywordIndex
+    from snapshot import DEFAULT_SNAPSHOT_DIR, load_snapshot
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("snapshot_dir", nargs="?", default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--k", type=int, default=NEIGHBOUR_K)
+    args = parser.parse_args()
+
+    snapshot = load_snapshot(args.snapshot_dir)
+    if snapshot is None:
+        raise SystemExit(f"No usable search snapshot in {args.snapshot_dir}; run python snapshot.py first")
+    keyword_index = KeywordIndex(snapshot["inv_idx"], snapshot["idf"], snapshot["doc_norms"])
+    timings = build_neighbour_graphs(args.snapshot_dir, snapshot["bert_embeddings"], keyword_index, args.k)
+    print(json.dumps({name: round(seconds, 3) for name, seconds in timings.items()}))
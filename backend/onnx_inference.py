@@ -0,0 +1,284 @@
+"""
+Optional ONNX Runtime CPU backend for the query encoder and the sentiment classifier.
+
+Both models are exported once to ONNX and dynamically quantized to int8 weights, which runs
+several times faster than eager fp32 PyTorch on CPU with a small accuracy cost. Select it with
+INFERENCE_BACKEND=onnx; the default ("torch") keeps the sentence_transformers / transformers
+models. Requires the onnx and onnxruntime packages.
+
+    python onnx_inference.py export [--output onnx_models]
+    python onnx_inference.py check  [--queries 200] [--min-cosine 0.99] [--min-agreement 0.97] [--max-score-diff 0.02]
+
+`check` compares the quantized models against the PyTorch ones on queries taken from course
+titles, reports embedding cosine drift, sentiment label agreement and score drift, plus the
+latency of both backends, and exits non-zero if the drift is outside the given bounds.
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", os.path.join(base_path, "onnx_models"))
+# 0 lets ONNX Runtime use one thread per core.
+ONNX_INTRA_OP_THREADS = int(os.environ.get("ONNX_INTRA_OP_THREADS", 0))
+
+ENCODER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+ENCODER_DIR = "all-MiniLM-L6-v2"
+SENTIMENT_DIR = "distilbert-sst-2"
+MODEL_FILE = "model.int8.onnx"
+
+
+def export_model(model_name, output_dir, classifier=False, opset=14):
+    """
+    Exports a Hugging Face model to <output_dir>/model.onnx with dynamic batch and sequence axes,
+    quantizes its weights to int8 in <output_dir>/model.int8.onnx, and saves the tokenizer and config next to it.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model_class = AutoModelForSequenceClassification if classifier else AutoModel
+    model = model_class.from_pretrained(model_name)
+    model.config.return_dict = False
+    model.eval()
+
+    inputs = tokenizer(["an example course description", "a query"], padding=True, return_tensors="pt")
+    # The tokenizer's key order (input_ids, token_type_ids, attention_mask for BERT) differs from
+    # forward()'s (input_ids, attention_mask, token_type_ids), and export binds its args to forward()
+    # positionally, so inputs are passed and named in forward()'s order.
+    parameters = list(inspect.signature(model.forward).parameters)
+    input_names = [name for name in parameters if name in inputs]
+    if input_names != parameters[:len(input_names)] or len(input_names) != len(inputs):
+        raise ValueError(f"Cannot pass tokenizer outputs {list(inputs)} positionally to {type(model).__name__}.forward")
+    output_name = "logits" if classifier else "last_hidden_state"
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(inputs[name] for name in input_names), fp32_path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names},
+                          output_name: {0: "batch"} if classifier else {0: "batch", 1: "sequence"}},
+            opset_version=opset,
+        )
+    _check_export(model, inputs, input_names, fp32_path)
+    quantize_dynamic(fp32_path, os.path.join(output_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    print(f"Exported {model_name} to {output_dir}")
+
+
+def _check_export(model, inputs, input_names, fp32_path, atol=1e-4):
+    """
+    Runs the unquantized export on the example inputs, fed by name as _OnnxModel.run does, and
+    raises if it disagrees with PyTorch, e.g. because two graph inputs were bound to the wrong names.
+    """
+    import onnxruntime as ort
+    import torch
+
+    with torch.no_grad():
+        expected = model(**inputs)[0].numpy()
+    session = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"])
+    actual = session.run(None, {name: inputs[name].numpy().astype(np.int64) for name in input_names})[0]
+    if not np.allclose(expected, actual, atol=atol):
+        raise RuntimeError(f"ONNX export of {type(model).__name__} does not match PyTorch "
+                           f"(max abs diff {np.abs(expected - actual).max():.2e})")
+
+
+def export_models(output_dir=ONNX_MODEL_DIR):
+    export_model(ENCODER_MODEL, os.path.join(output_dir, ENCODER_DIR))
+    export_model(SENTIMENT_MODEL, os.path.join(output_dir, SENTIMENT_DIR), classifier=True)
+
+
+class _OnnxModel:
+    """
+    A tokenizer plus an ONNX Runtime session over a quantized model directory written by export_model().
+
+    ONNX Runtime's thread pool does not survive fork(), so the session is created on first use in each
+    process, like the MicroBatcher worker threads.
+    """
+
+    def __init__(self, model_dir, max_length=512):
+        from transformers import AutoTokenizer
+
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, MODEL_FILE)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"No quantized ONNX model at {self.model_path}; run python onnx_inference.py export")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    def session(self):
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                self._create_session()
+        return self._session
+
+    def _create_session(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in self._session.get_inputs()]
+        self._session_pid = os.getpid()
+
+    def run(self, texts):
+        """Runs one padded batch and returns the first output with the attention mask."""
+        session = self.session()
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        feed = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        return session.run(None, feed)[0], encoded["attention_mask"]
+
+    def batches(self, texts, batch_size):
+        """
+        Yields (positions, texts) batches of similar length, so little of each batch is padding.
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            positions = order[start:start + batch_size]
+            yield positions, [texts[i] for i in positions]
+
+
+class OnnxSentenceEncoder(_OnnxModel):
+    """
+    Drop-in replacement for SentenceTransformer("all-MiniLM-L6-v2").encode: mean pooling over the
+    attention mask, then L2 normalization, as the sentence-transformers model does.
+    """
+
+    def __init__(self, model_dir=os.path.join(ONNX_MODEL_DIR, ENCODER_DIR), max_length=256):
+        super().__init__(model_dir, max_length)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = None
+        for positions, batch in self.batches(texts, batch_size):
+            hidden, mask = self.run(batch)
+            mask = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[positions] = pooled
+        if embeddings is None:
+            embeddings = np.empty((0, 384), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class OnnxSentimentClassifier(_OnnxModel):
+    """
+    Drop-in replacement for the transformers sentiment-analysis pipeline: returns one
+    {"label", "score"} dict per text for the most likely label.
+    """
+
+    def __init__(self, model_dir=os.path.join(ONNX_MODEL_DIR, SENTIMENT_DIR), max_length=512):
+        super().__init__(model_dir, max_length)
+        with open(os.path.join(model_dir, "config.json"), "r") as f:
+            self.labels = {int(i): label for i, label in json.load(f)["id2label"].items()}
+
+    def __call__(self, texts, batch_size=32, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        results = [None] * len(texts)
+        for positions, batch in self.batches(texts, batch_size or 32):
+            logits, _ = self.run(batch)
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+            for position, row in zip(positions, probs):
+                best = int(row.argmax())
+                results[position] = {"label": self.labels[best], "score": float(row[best])}
+        return results
+
+
+def _sample_queries(n):
+    import random
+
+    with open(os.path.join(base_path, "courses_w_tokens.json"), "r") as f:
+        courses = json.load(f)
+    texts = [c.get("course title") or c.get("title") for c in courses.values()]
+    texts = [t for t in texts if t]
+    random.seed(42)
+    return random.sample(texts, min(n, len(texts))) + ["I loved this class", "boring and way too much work"]
+
+
+def _time_per_query(fn, queries, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        fn(queries[i:i + batch_size])
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def check(model_dir=ONNX_MODEL_DIR, n_queries=200, min_cosine=0.99, min_agreement=0.97, max_score_diff=0.02):
+    """
+    Parity and latency of the quantized models against the PyTorch ones. Returns True if every
+    embedding is within min_cosine of the PyTorch one, sentiment labels agree on at least
+    min_agreement of the queries, and the mean signed sentiment score differs by at most max_score_diff.
+    """
+    from sentence_transformers import SentenceTransformer
+    from transformers import pipeline
+
+    queries = _sample_queries(n_queries)
+    torch_encoder = SentenceTransformer("all-MiniLM-L6-v2")
+    onnx_encoder = OnnxSentenceEncoder(os.path.join(model_dir, ENCODER_DIR))
+    torch_sentiment = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+    onnx_sentiment = OnnxSentimentClassifier(os.path.join(model_dir, SENTIMENT_DIR))
+
+    expected = torch_encoder.encode(queries, normalize_embeddings=True)
+    actual = onnx_encoder.encode(queries)
+    cosines = (expected * actual).sum(axis=1)
+
+    expected_sentiment = torch_sentiment(queries)
+    actual_sentiment = onnx_sentiment(queries)
+    agreement = np.mean([a["label"] == b["label"] for a, b in zip(expected_sentiment, actual_sentiment)])
+    signed = lambda r: r["score"] if r["label"] == "POSITIVE" else -r["score"]
+    score_diffs = np.abs([signed(a) - signed(b) for a, b in zip(expected_sentiment, actual_sentiment)])
+
+    print(f"{len(queries)} queries")
+    print(f"embedding cosine to torch: min {cosines.min():.4f}  mean {cosines.mean():.4f}")
+    print(f"sentiment label agreement: {agreement:.3f}   signed score diff: max {score_diffs.max():.4f}  "
+          f"mean {score_diffs.mean():.4f}")
+
+    for batch_size in (1, 8, 32):
+        rows = {
+            "torch encode": _time_per_query(lambda b: torch_encoder.encode(b), queries, batch_size),
+            "onnx encode": _time_per_query(onnx_encoder.encode, queries, batch_size),
+            "torch sentiment": _time_per_query(lambda b: torch_sentiment(b, batch_size=len(b)), queries, batch_size),
+            "onnx sentiment": _time_per_query(onnx_sentiment, queries, batch_size),
+        }
+        print(f"batch {batch_size:>2}: " + "   ".join(f"{name} {ms:6.2f} ms/query" for name, ms in rows.items()))
+
+    ok = cosines.min() >= min_cosine and agreement >= min_agreement and score_diffs.mean() <= max_score_diff
+    print("parity OK" if ok else "parity FAILED")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-agreement", type=float, default=0.97)
+    parser.add_argument("--max-score-diff", type=float, default=0.02)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_models(args.output)
+    else:
+        sys.exit(0 if check(args.output, args.queries, args.min_cosine, args.min_agreement, args.max_score_diff) else 1)
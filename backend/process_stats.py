@@ -0,0 +1,71 @@
+"""
+Memory usage of the serving processes, from /proc/<pid>/smaps_rollup (Linux).
+
+RSS counts every resident page a process maps, so with a preloaded gunicorn master it counts
+the shared model weights and mmapped index arrays once per worker. PSS divides each shared page
+by the number of processes mapping it, so summing PSS over the master and workers gives the
+real footprint, and Private_* is what each additional worker costs.
+
+    python process_stats.py <gunicorn master pid>
+"""
+import os
+import resource
+import sys
+
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Swap": "swap",
+}
+
+
+def process_memory(pid="self"):
+    """
+    Memory of one process in MB. Falls back to peak RSS from getrusage where smaps_rollup is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        if pid != "self":
+            return {}
+        return {"max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+    memory = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in SMAPS_FIELDS:
+            memory[SMAPS_FIELDS[parts[0].rstrip(":")]] = int(parts[1]) / 1024
+    return memory
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def worker_report(master_pid):
+    """Memory of the master and each of its worker processes, plus the PSS total."""
+    processes = {"master": process_memory(master_pid)}
+    for child in child_pids(master_pid):
+        processes[f"worker {child}"] = process_memory(child)
+    total_pss = sum(memory.get("pss", 0) for memory in processes.values())
+    return processes, total_pss
+
+
+if __name__ == "__main__":
+    master_pid = int(sys.argv[1]) if len(sys.argv) > 1 else os.getpid()
+    processes, total_pss = worker_report(master_pid)
+    print(f"{'process':>16} {'rss':>9} {'pss':>9} {'shared':>9} {'private':>9}   (MB)")
+    for name, memory in processes.items():
+        shared = memory.get("shared_clean", 0) + memory.get("shared_dirty", 0)
+        private = memory.get("private_clean", 0) + memory.get("private_dirty", 0)
+        print(f"{name:>16} {memory.get('rss', 0):9.1f} {memory.get('pss', 0):9.1f} {shared:9.1f} {private:9.1f}")
+    print(f"{'total pss':>16} {total_pss:9.1f}")
@@ -0,0 +1,48 @@
+import os
+
+from caching import LRUCache
+
+# Process-wide cache of query embeddings keyed by normalized query text, shared by every request.
+query_embedding_cache = LRUCache(
+    maxsize=int(os.environ.get("QUERY_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("QUERY_CACHE_TTL", 3600)),
+)
+
+
+def normalize_query(query):
+    """
+    Lowercases and collapses whitespace. The MiniLM tokenizer is uncased, so queries that
+    differ only in case or spacing get the same embedding.
+    """
+    return " ".join(query.lower().split())
+
+
+class QueryAnalysis:
+    """
+    Everything derived from one query string during a request, computed at most once.
+
+    The embedding is looked up in query_embedding_cache before falling back to `encoder`,
+    so the model runs once per distinct query rather than once per scoring function.
+    """
+
+    def __init__(self, query, encoder):
+        self.query = query
+        self.normalized = normalize_query(query)
+        self._encoder = encoder
+        self._embedding = None
+        self._memo = {}
+
+    @property
+    def embedding(self):
+        if self._embedding is None:
+            self._embedding = query_embedding_cache.get_or_compute(
+                self.normalized, lambda: self._encoder(self.normalized))
+        return self._embedding
+
+    def memo(self, name, compute):
+        """
+        Returns compute() the first time `name` is asked for during this request, and the same value afterwards.
+        """
+        if name not in self._memo:
+            self._memo[name] = compute()
+        return self._memo[name]
@@ -1,59 +1,288 @@
+"""
+Scrapes the CU Reviews page of every course in courses.csv into course_reviews.json.
+
+CU Reviews renders reviews client-side, so pages are loaded in headless Chrome. A pool of
+--workers threads each drives its own browser. Instead of sleeping a fixed time per course,
+each page waits until its review cards appear, or until the course page itself has rendered
+(--ready-selector, the course title heading by default) and --empty-grace seconds pass with
+no card, which records the course as having no reviews. A page showing neither within
+--timeout is a failure that is retried on the next run. Only the review cards of the page
+source are parsed.
+
+Every scraped course is appended to course_reviews.jsonl with the time it was fetched, so an
+interrupted run keeps everything it finished. Later runs only refetch courses that are
+missing or older than --max-age-days. course_reviews.json is rebuilt from the latest record
+of each course, on top of its previous contents, so courses that failed keep their reviews,
+and an empty result never replaces reviews scraped before.
+
+    python reviews_scrapper.py [--workers 4] [--max-age-days 30] [--base-url https://www.cureviews.org]
+                               [--ready-selector h1] [--empty-grace 2]
+
+--base-url can point at a local server serving recorded pages under /course/<subject>/<number>.
+"""
+import argparse
+import json
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
-import numpy as np
+from bs4 import BeautifulSoup, SoupStrainer
 from selenium import webdriver
-from bs4 import BeautifulSoup
-import json
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+BASE_URL = "https://www.cureviews.org"
+REVIEW_CARD_CLASS = "_card_1hc39_3"
+# Rendered together with the course data; a course page showing it but no review card has no reviews
+PAGE_READY_SELECTOR = "h1"
+# Seconds review cards get to appear after the course page has rendered
+EMPTY_GRACE = 2.0
+MAX_REVIEWS = 5
+METRIC_NAMES = ["overall", "difficulty", "workload", "professor", "grade"]
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+courses_path = os.path.join(base_path, "courses.csv")
+output_path = os.path.join(base_path, "course_reviews.json")
+records_path = os.path.join(base_path, "course_reviews.jsonl")
+
 
-driver = webdriver.Chrome()
+def make_driver(page_load_timeout):
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    # Return from driver.get() once the DOM is parsed; wait_for_reviews does the rest of the waiting.
+    options.page_load_strategy = "eager"
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    return driver
 
-df = pd.read_csv('courses.csv')
 
-def getCourseReview(url, course):
-    print(f"Getting reviews data for {course}")
-    driver.get(url)
+def wait_for_reviews(driver, timeout, ready_selector=PAGE_READY_SELECTOR, empty_grace=EMPTY_GRACE):
+    """
+    Waits until a review card is rendered, or until ready_selector has matched for empty_grace
+    seconds without any card (a course without reviews). Raises TimeoutException if neither
+    happens within `timeout` seconds, e.g. when the page never rendered.
+    """
+    rendered = []
 
-    time.sleep(5)
+    def ready(d):
+        if d.find_elements(By.CLASS_NAME, REVIEW_CARD_CLASS):
+            return True
+        if not ready_selector or not d.find_elements(By.CSS_SELECTOR, ready_selector):
+            return False
+        if not rendered:
+            rendered.append(time.monotonic())
+        return time.monotonic() - rendered[0] >= empty_grace
+
+    WebDriverWait(driver, timeout, poll_frequency=0.1).until(ready)
+
+
+def parse_reviews(page_source):
+    """The first MAX_REVIEWS reviews on a course page"""
+    soup = BeautifulSoup(page_source, "html.parser", parse_only=SoupStrainer("div", {"class": REVIEW_CARD_CLASS}))
+    reviews = soup.find_all("div", {"class": REVIEW_CARD_CLASS})
 
-    page_source = driver.page_source
-    soup = BeautifulSoup(page_source, "html.parser")
-    
-    reviews = soup.find_all("div", {"class": "_card_1hc39_3"})
-    
     results = []
-    for review in reviews[:5]:
+    for review in reviews[:MAX_REVIEWS]:
         course_review = {}
         metrics = review.find_all("span", {"class": "_bold_1hc39_48"})
         for i, metric in enumerate(metrics):
-            if i == 0:
-                course_review['overall'] = metric.get_text().strip()
-            elif i == 1:
-                course_review['difficulty'] = metric.get_text().strip()
-            elif i == 2:
-                course_review['workload'] = metric.get_text().strip()
-            elif i == 3:
-                course_review['professor'] = metric.get_text().strip()
-            elif i == 4:
-                course_review['grade'] = metric.get_text().strip()
-            else:
-                course_review['major'] = metric.get_text().strip()
-            
+            name = METRIC_NAMES[i] if i < len(METRIC_NAMES) else "major"
+            course_review[name] = metric.get_text().strip()
+
         comment = review.find("div", {"class": "_reviewtext_1hc39_52 _collapsedtext_1hc39_70"})
         if comment:
             course_review["comment"] = comment.get_text().strip()
         results.append(course_review)
     return results
-        
-reviews = {}
 
-for course in df['class']:
+
+class DriverPool:
+    """
+    One Chrome driver per worker thread, created on first use and replaced if it crashes.
+    """
+
+    def __init__(self, page_load_timeout=30):
+        self.page_load_timeout = page_load_timeout
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = make_driver(self.page_load_timeout)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def discard(self):
+        driver = getattr(self._local, "driver", None)
+        self._local.driver = None
+        if driver is not None:
+            with self._lock:
+                self._drivers.remove(driver)
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+    def quit(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+
+class ReviewStore:
+    """
+    The per-course checkpoint: course_reviews.jsonl holds one {"course", "fetched", "reviews"}
+    line per scrape, and the latest line of a course wins.
+    """
+
+    def __init__(self, path=records_path, seed_path=output_path):
+        self.path = path
+        self.latest = {}
+        if os.path.exists(seed_path):
+            # Reviews in course_reviews.json without a checkpoint record (e.g. scraped before
+            # checkpoints existed) have no fetch time, so they count as stale but are still kept
+            # for courses whose refetch fails.
+            with open(seed_path, "r") as f:
+                for course, reviews in json.load(f).items():
+                    self.latest[course] = {"course": course, "fetched": 0, "reviews": reviews}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.latest[record["course"]] = record
+        self._lock = threading.Lock()
+
+    def is_stale(self, course, max_age):
+        record = self.latest.get(course)
+        return record is None or time.time() - record["fetched"] > max_age
+
+    def add(self, course, reviews):
+        """
+        Records a course's reviews with the time they were fetched; an empty list records a course
+        without reviews, which is then fresh until max_age like any other. Returns False, storing
+        nothing, when an empty result would replace reviews scraped before: the course keeps them
+        and stays stale.
+        """
+        record = {"course": course, "fetched": time.time(), "reviews": reviews}
+        with self._lock:
+            if not reviews and self.latest.get(course, {}).get("reviews"):
+                return False
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.latest[course] = record
+        return True
+
+    def reviews(self, courses):
+        return {course: self.latest[course]["reviews"] for course in courses if course in self.latest}
+
+
+def course_url(base_url, course):
     txt, code = course.split(" ")
-    url = f"https://www.cureviews.org/course/{txt}/{code}"
-    data = getCourseReview(url, course)
-    reviews[course] = data
+    return f"{base_url.rstrip('/')}/course/{txt}/{code}"
+
+
+def getCourseReview(drivers, url, timeout, ready_selector=PAGE_READY_SELECTOR, empty_grace=EMPTY_GRACE):
+    driver = drivers.get()
+    try:
+        driver.get(url)
+        wait_for_reviews(driver, timeout, ready_selector, empty_grace)
+        return parse_reviews(driver.page_source)
+    except TimeoutException:
+        # A slow page, not a broken browser (TimeoutException is itself a WebDriverException).
+        raise
+    except WebDriverException:
+        # The browser may have crashed; start a fresh one for this thread's next course.
+        drivers.discard()
+        raise
+
+
+def scrape(base_url=BASE_URL, workers=4, max_age_days=30, timeout=20, ready_selector=PAGE_READY_SELECTOR,
+           empty_grace=EMPTY_GRACE, refresh_all=False):
+    """
+    Scrapes every stale course and writes course_reviews.json.
+
+    Returns:
+        list: The courses that failed and will be retried on the next run.
+    """
+    courses = list(pd.read_csv(courses_path)['class'])
+    store = ReviewStore()
+    max_age = -1 if refresh_all else max_age_days * 86400
+    stale = [course for course in courses if store.is_stale(course, max_age)]
+    print(f"{len(courses)} courses, {len(stale)} stale or missing to scrape with {workers} browsers")
+
+    drivers = DriverPool(page_load_timeout=timeout)
+    failed = []
+    done = [0]
+    done_lock = threading.Lock()
+    start = time.perf_counter()
+
+    def scrape_course(course):
+        try:
+            reviews = getCourseReview(drivers, course_url(base_url, course), timeout, ready_selector, empty_grace)
+        except (TimeoutException, WebDriverException) as e:
+            print(f"Failed to get reviews for {course}: {type(e).__name__}")
+            failed.append(course)
+            return
+        if not store.add(course, reviews):
+            print(f"Got no reviews for {course}, keeping its previously scraped reviews")
+            failed.append(course)
+            return
+        with done_lock:
+            done[0] += 1
+            if done[0] % 50 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{done[0]}/{len(stale)} courses, {done[0] / elapsed:.2f} pages/sec")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(scrape_course, stale))
+    finally:
+        drivers.quit()
+
+    reviews = store.reviews(courses)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(reviews, f, indent=4)
+    os.replace(tmp_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    rate = f"{done[0] / elapsed:.2f} pages/sec" if done[0] and elapsed else "nothing scraped"
+    print(f"Scraped {done[0]} course pages in {elapsed:.1f}s ({rate})")
+    print(f"Data for {len(reviews)} courses saved to {output_path}")
+    if failed:
+        print(f"{len(failed)} courses failed and will be retried on the next run")
+    return failed
+
 
-with open("course_reviews.json", "w") as f:
-    json.dump(reviews, f, indent=4)
-print("Data saved to course_reviews.json")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--workers", type=int, default=4, help="Number of browsers scraping at once")
+    parser.add_argument("--max-age-days", type=float, default=30, help="Refetch courses scraped longer ago than this")
+    parser.add_argument("--refresh-all", action="store_true")
+    parser.add_argument("--timeout", type=float, default=20, help="Longest wait for one course page")
+    parser.add_argument("--ready-selector", default=PAGE_READY_SELECTOR,
+                        help="CSS selector of an element rendered with the course data; a page showing it "
+                             "but no review card is recorded as a course without reviews")
+    parser.add_argument("--empty-grace", type=float, default=EMPTY_GRACE,
+                        help="Seconds to wait for review cards once the course page has rendered")
+    args = parser.parse_args()
 
-driver.quit()
\ No newline at end of file
+    failed = scrape(args.base_url, args.workers, args.max_age_days, args.timeout, args.ready_selector,
+                    args.empty_grace, args.refresh_all)
+    raise SystemExit(1 if failed else 0)
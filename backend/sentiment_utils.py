@@ -1,6 +1,9 @@
 import json
 import os
-from transformers import pipeline
+import numpy as np
+from batching import INFERENCE_TIMEOUT, MicroBatcher
+from startup import Lazy
+from onnx_inference import INFERENCE_BACKEND, OnnxSentimentClassifier
 
 # Load and reverse course sentiment scores
 def load_course_sentiments(path="review_sentiments.json"):
@@ -9,18 +12,47 @@ def load_course_sentiments(path="review_sentiments.json"):
 
     return raw_scores
 
-# Load query sentiment pipeline
-sentiment_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+def load_sentiment_pipeline():
+    if INFERENCE_BACKEND == "onnx":
+        return OnnxSentimentClassifier()
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+
+# Query sentiment pipeline, loaded on first use or by startup.warm_up().
+# generate_review_sentiments uses this same instance.
+sentiment_model = Lazy(load_sentiment_pipeline, "sentiment pipeline")
+
+def _classify_batch(texts):
+    return sentiment_model.get()([text[:512] for text in texts], batch_size=len(texts))
+
+# Concurrent queries are classified together instead of one pipeline call each
+sentiment_batcher = MicroBatcher(_classify_batch, name="sentiment-batcher")
 
 def get_query_sentiment(query):
     try:
-        result = sentiment_pipeline(query[:512])[0]
+        result = sentiment_batcher(query)
         score = result["score"]
         return score if result["label"] == "POSITIVE" else -score
     except Exception as e:
         print(f"Sentiment analysis failed: {e}")
         return 0  # neutral fallback
 
+def get_query_sentiments(queries):
+    """get_query_sentiment for many queries, submitted to the batcher together so they share model batches"""
+    futures = [sentiment_batcher.submit(query) for query in queries]
+    sentiments = []
+    for future in futures:
+        try:
+            result = future.result(timeout=INFERENCE_TIMEOUT)
+            score = result["score"]
+            sentiments.append(score if result["label"] == "POSITIVE" else -score)
+        except Exception as e:
+            print(f"Sentiment analysis failed: {e}")
+            sentiments.append(0)
+    return sentiments
+
 def adjust_bert_scores_with_sentiment(query_sentiment, course_sentiments, bert_results, course_codes, alpha=0.3):
     rescored = []
     for sim_score, idx in bert_results:
@@ -30,4 +62,13 @@ def adjust_bert_scores_with_sentiment(query_sentiment, course_sentiments, bert_r
             alignment = 1 - alpha * abs(query_sentiment - course_sent)
             new_score = sim_score * alignment
             rescored.append((new_score, idx))
-    return rescored
\ No newline at end of file
+    return rescored
+
+def adjust_scores_with_sentiment(query_sentiment, sentiments, results, alpha=0.3):
+    """Same as adjust_bert_scores_with_sentiment, with course sentiments given as an array indexed by result row"""
+    if not results:
+        return []
+    scores, rows = zip(*results)
+    rows = np.asarray(rows)
+    alignment = 1 - alpha * np.abs(query_sentiment - sentiments[rows])
+    return list(zip((np.asarray(scores) * alignment).tolist(), rows.tolist()))
@@ -2,11 +2,11 @@ import numpy as np
 from nltk.tokenize import TreebankWordTokenizer
 from nltk.corpus import stopwords
 import string
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import TruncatedSVD
-from sklearn.metrics.pairwise import cosine_similarity
 import joblib
 import nltk
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     stop_words = set(stopwords.words('english'))
@@ -20,31 +20,128 @@ punctuation = set(string.punctuation)
 tokenizer = TreebankWordTokenizer()
 
 
-def build_inverted_index(courses):
+def count_terms(tokens):
     """
-    Builds an inverted index from a list of movies.
+    Counts the tokens of one description, skipping stop words and punctuation.
+    """
+    return Counter(t for t in tokens if t.lower() not in stop_words and t not in punctuation)
+
+
+def _build_partial_index(args):
+    start, token_lists = args
+    dic = {}
+    for offset, tokens in enumerate(token_lists):
+        for token, count in count_terms(tokens).items():
+            if token not in dic:
+                dic[token] = [(start + offset, count)]
+            else:
+                dic[token].append((start + offset, count))
+    return dic
+
+
+def build_inverted_index(courses, n_jobs=1, shard_size=2000):
+    """
+    Builds an inverted index from a list of courses.
 
     Args:
-        movies (list): A list of movie dictionaries, where each dictionary contains a 'tokens' key
-                       representing the tokens in the movie.
+        courses (list): A list of course dictionaries, where each dictionary contains a 'description_tokens' key
+                        representing the tokens in the course description.
+        n_jobs (int, optional): Number of worker processes. The corpus is split into shards of
+                                shard_size courses whose partial indexes are merged in order.
+        shard_size (int, optional): Number of courses per shard when n_jobs > 1.
 
     Returns:
         dict: The inverted index dictionary, where each key is a token and the corresponding value
-              is a list of tuples. Each tuple contains the index of the movie in the 'movies' list
-              and the count of the token in that movie.
+              is a list of tuples. Each tuple contains the index of the course in the 'courses' list
+              and the count of the token in that course, in increasing index order.
     """
+    token_lists = [doc['description_tokens'] for doc in courses]
+    if n_jobs <= 1 or len(token_lists) <= shard_size:
+        return _build_partial_index((0, token_lists))
+
+    shards = [(start, token_lists[start:start + shard_size]) for start in range(0, len(token_lists), shard_size)]
     dic = {}
-    for idx, doc in enumerate(courses):
-        filtered_tokens = [t for t in doc['description_tokens'] if t.lower() not in stop_words and t not in punctuation]
-        token_set = set(filtered_tokens)
-        for token in token_set:
-            if token not in dic:
-                dic[token] = [(idx, filtered_tokens.count(token))]
-            else:
-                dic[token].append((idx, filtered_tokens.count(token)))
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        # map() yields shards in order, so each posting list stays sorted by doc id.
+        for partial in executor.map(_build_partial_index, shards):
+            for token, postings in partial.items():
+                if token not in dic:
+                    dic[token] = postings
+                else:
+                    dic[token].extend(postings)
     return dic
 
 
+def ensure_description_tokens(courses, tokenizer=tokenizer):
+    """
+    Fills in missing 'description_tokens' for a dict of courses keyed by course code.
+
+    Returns:
+        int: The number of courses whose tokens had to be generated.
+    """
+    generated = 0
+    for code, data in courses.items():
+        if 'description_tokens' not in data or not data['description_tokens']:
+            if 'description' in data and data['description']:
+                data['description_tokens'] = tokenizer.tokenize(data['description'].lower())
+            else:
+                data['description_tokens'] = []
+            generated += 1
+    return generated
+
+
+class PostingsIndex(Mapping):
+    """
+    Read-only inverted index backed by flat posting arrays.
+
+    Behaves like the dict returned by build_inverted_index (term -> list of (doc_id, tf)),
+    but the postings live in three arrays that can be memory-mapped from disk:
+    posting list i is docs[offsets[i]:offsets[i + 1]] / tfs[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, terms, offsets, docs, tfs):
+        self.terms = list(terms)
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+
+    def __getitem__(self, term):
+        i = self.term_ids[term]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.docs[start:end].tolist(), self.tfs[start:end].tolist()))
+
+    def __contains__(self, term):
+        return term in self.term_ids
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self):
+        return len(self.terms)
+
+
+def flatten_inverted_index(inv_idx):
+    """
+    Converts an inverted index dict into flat posting arrays.
+
+    Returns:
+        tuple: (terms, offsets, docs, tfs) as accepted by PostingsIndex.
+    """
+    terms = list(inv_idx.keys())
+    lengths = np.array([len(inv_idx[term]) for term in terms], dtype=np.int64)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    docs = np.empty(offsets[-1], dtype=np.int32)
+    tfs = np.empty(offsets[-1], dtype=np.int32)
+    for i, term in enumerate(terms):
+        postings = inv_idx[term]
+        if postings:
+            docs[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]] = zip(*postings)
+    return terms, offsets, docs, tfs
+
+
 def compute_idf(inv_idx, n_docs):
     """
     Compute the inverse document frequency (IDF) for each word in the given inverted index.
@@ -91,6 +188,121 @@ def compute_doc_norms(index, idf, n_docs):
 
 
 
+class IncrementalIndex:
+    """
+    Inverted index that supports adding, updating and removing single courses while keeping
+    idf and doc norms consistent with compute_idf / compute_doc_norms, without a full rebuild.
+
+    idf(t) = log2(n) - log2(1 + df(t)), so with L = log2(n) and b(t) = -log2(1 + df(t)) each
+    squared doc norm is L^2 * A + 2L * B + C, where A, B and C are per-document sums of tf^2,
+    tf^2 * b(t) and tf^2 * b(t)^2. A course change only touches the sums of the documents sharing
+    one of its terms; a change in n is absorbed by L.
+
+    Args:
+        courses (list): The initial courses; document ids are their positions in this list.
+    """
+
+    def __init__(self, courses=()):
+        self.postings = {}
+        self.doc_terms = []
+        self.n_docs = 0
+        self.removed = set()
+        self._a = []
+        self._b = []
+        self._c = []
+        self._bulk_load(courses)
+
+    def _bulk_load(self, courses):
+        for doc_id, course in enumerate(courses):
+            counts = count_terms(course['description_tokens'])
+            self.doc_terms.append(counts or None)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+        self.n_docs = len(self.doc_terms)
+
+        bias = {term: -np.log2(1 + len(postings)) for term, postings in self.postings.items()}
+        for counts in self.doc_terms:
+            counts = counts or {}
+            self._a.append(sum(tf ** 2 for tf in counts.values()))
+            self._b.append(sum(tf ** 2 * bias[term] for term, tf in counts.items()))
+            self._c.append(sum(tf ** 2 * bias[term] ** 2 for term, tf in counts.items()))
+
+    def _term_bias(self, term):
+        return -np.log2(1 + len(self.postings.get(term, ())))
+
+    def _adjust_df(self, term, doc_id, tf):
+        """Adds (tf > 0) or removes (tf is None) one posting and re-weights the docs sharing the term."""
+        old_bias = self._term_bias(term)
+        postings = self.postings.setdefault(term, {})
+        if tf is None:
+            postings.pop(doc_id, None)
+        else:
+            postings[doc_id] = tf
+        new_bias = self._term_bias(term)
+        for other, other_tf in postings.items():
+            if other != doc_id:
+                weight = other_tf ** 2
+                self._b[other] += weight * (new_bias - old_bias)
+                self._c[other] += weight * (new_bias ** 2 - old_bias ** 2)
+        if not postings:
+            del self.postings[term]
+
+    def _set_terms(self, doc_id, counts):
+        old = self.doc_terms[doc_id] or Counter()
+        for term in old.keys() - counts.keys():
+            self._adjust_df(term, doc_id, None)
+        for term, tf in counts.items():
+            if old.get(term) != tf:
+                self._adjust_df(term, doc_id, tf)
+
+        self.doc_terms[doc_id] = counts or None
+        self._a[doc_id] = sum(tf ** 2 for tf in counts.values())
+        self._b[doc_id] = sum(tf ** 2 * self._term_bias(term) for term, tf in counts.items())
+        self._c[doc_id] = sum(tf ** 2 * self._term_bias(term) ** 2 for term, tf in counts.items())
+
+    def add_course(self, course):
+        """
+        Returns:
+            int: The document id of the new course.
+        """
+        doc_id = len(self.doc_terms)
+        self.doc_terms.append(None)
+        self._a.append(0.0)
+        self._b.append(0.0)
+        self._c.append(0.0)
+        self.n_docs += 1
+        self._set_terms(doc_id, count_terms(course['description_tokens']))
+        return doc_id
+
+    def update_course(self, doc_id, course):
+        self._set_terms(doc_id, count_terms(course['description_tokens']))
+
+    def remove_course(self, doc_id):
+        """
+        Drops the course's postings. The id is not reused, so other document ids stay valid.
+        """
+        if doc_id in self.removed:
+            return
+        self._set_terms(doc_id, Counter())
+        self.removed.add(doc_id)
+        self.n_docs -= 1
+
+    def inverted_index(self):
+        """The index in build_inverted_index format."""
+        return {term: sorted(postings.items()) for term, postings in self.postings.items()}
+
+    def idf(self):
+        """The idf of every indexed term, as compute_idf would return it for the live documents."""
+        log_n = np.log2(self.n_docs) if self.n_docs else 0.0
+        return {term: log_n - np.log2(1 + len(postings)) for term, postings in self.postings.items()}
+
+    def doc_norms(self):
+        """The document norms, as compute_doc_norms would return them (0 for removed ids)."""
+        log_n = np.log2(self.n_docs) if self.n_docs else 0.0
+        a, b, c = np.array(self._a), np.array(self._b), np.array(self._c)
+        return np.sqrt(np.maximum(log_n ** 2 * a + 2 * log_n * b + c, 0))
+
+
 def accumulate_dot_scores(query_word_counts, index, idf):
     doc_scores = {}
     contributions = {}
@@ -152,14 +364,22 @@ def search(query, index, idf, doc_norms, score_func=accumulate_dot_scores, token
     return res
 
 
-def build_semantic_search(courses_list, tokenizer, n_components=100):
-    descriptions = [" ".join(course["description_tokens"]) for course in courses_list]
-
+def _semantic_tokenizer(tokenizer):
     def custom_tokenizer(text):
         tokens = tokenizer.tokenize(text.lower())
         return [t for t in tokens if t not in stop_words and t not in punctuation]
+    return custom_tokenizer
+
+
+# sklearn is imported inside the semantic search functions, so importing this module for the
+# keyword index does not load it.
+def build_semantic_search(courses_list, tokenizer, n_components=100):
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    descriptions = [" ".join(course["description_tokens"]) for course in courses_list]
 
-    vectorizer = TfidfVectorizer(tokenizer=custom_tokenizer)
+    vectorizer = TfidfVectorizer(tokenizer=_semantic_tokenizer(tokenizer))
     X = vectorizer.fit_transform(descriptions)
 
     svd = TruncatedSVD(n_components=n_components, random_state=42)
@@ -167,7 +387,48 @@ def build_semantic_search(courses_list, tokenizer, n_components=100):
 
     return vectorizer, svd, X_reduced
 
+def restore_semantic_search(vocabulary, idf_weights, components, tokenizer):
+    """
+    Rebuilds the fitted vectorizer and SVD from stored arrays instead of refitting them.
+
+    Args:
+        vocabulary (list): The vectorizer terms, ordered by feature index.
+        idf_weights (numpy.ndarray): The fitted vectorizer idf_ values.
+        components (numpy.ndarray): The fitted SVD components_ matrix.
+        tokenizer: The tokenizer used when the vectorizer was fitted.
+
+    Returns:
+        tuple: (vectorizer, svd) ready for transform().
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(tokenizer=_semantic_tokenizer(tokenizer))
+    vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+    vectorizer.idf_ = np.asarray(idf_weights)
+
+    svd = TruncatedSVD(n_components=components.shape[0], random_state=42)
+    svd.components_ = components
+    return vectorizer, svd
+
+
+def build_topic_words(vectorizer, svd, top_n_words=10):
+    """
+    Precomputes the top_n_words highest-weighted terms of every SVD component.
+
+    Returns:
+        list: One frozenset of terms per component, indexed like svd.components_.
+    """
+    terms = vectorizer.get_feature_names_out()
+    components = np.asarray(svd.components_)
+    top_n_words = min(top_n_words, components.shape[1])
+    top_indices = np.argpartition(-components, top_n_words - 1, axis=1)[:, :top_n_words]
+    return [frozenset(terms[row].tolist()) for row in top_indices]
+
+
 def semantic_search(query, vectorizer, svd, X_reduced, courses_list, tokenizer, top_k=10):
+    from sklearn.metrics.pairwise import cosine_similarity
+
     query_vec = vectorizer.transform([query])
     query_reduced = svd.transform(query_vec)
 
@@ -0,0 +1,237 @@
+"""
+Prebuilt search snapshot.
+
+Building the search indexes (tokenizing descriptions, the inverted index, idf/doc norms,
+the TF-IDF + SVD fit) and unpickling the BERT embeddings is what makes app.py slow to boot.
+This module writes all of those artifacts once into a versioned directory of .npy/.json
+files, and loads them back with np.load(mmap_mode='r') so the arrays are shared zero-copy
+through the page cache instead of being rebuilt in every process.
+
+Build it offline with:
+
+    python snapshot.py [output_dir]
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+from nltk.tokenize import TreebankWordTokenizer
+
+from similarity import (PostingsIndex, build_inverted_index, build_semantic_search, compute_doc_norms,
+                        compute_idf, ensure_description_tokens, flatten_inverted_index)
+from keyword_index import KeywordIndex
+from neighbours import NEIGHBOUR_K, build_neighbour_graphs
+from vector_index import (QUANTIZED_ARRAYS, TITLE_INDEX_DIR, build_ivf_index, build_quantized_index,
+                          normalize_rows, save_ivf_index, save_quantized_index)
+
+SNAPSHOT_FORMAT = "course-finder-search-snapshot"
+SNAPSHOT_VERSION = 2
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SNAPSHOT_DIR = os.environ.get("SEARCH_SNAPSHOT_DIR", os.path.join(base_path, "search_snapshot"))
+
+# Source files the snapshot is derived from. If one of them is present and no longer matches
+# the hash recorded at build time, the snapshot is considered stale.
+SOURCE_FILES = {
+    "courses": os.path.join(base_path, "courses_w_tokens.json"),
+    "bert_embeddings": os.path.join(base_path, "bert_embeddings.joblib"),
+    "bert_title_embeddings": os.path.join(base_path, "bert_title_embeddings.joblib"),
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def build_snapshot(output_dir=DEFAULT_SNAPSHOT_DIR, sources=SOURCE_FILES, tokenizer=None):
+    """
+    Builds every search artifact app.py needs and writes them to output_dir.
+
+    The snapshot is written to a temporary sibling directory and swapped in at the end,
+    so a running app never sees a half-written snapshot.
+    """
+    tokenizer = tokenizer or TreebankWordTokenizer()
+    timings = {}
+
+    start = time.perf_counter()
+    with open(sources["courses"], "r") as f:
+        courses = json.load(f)
+    generated = ensure_description_tokens(courses, tokenizer)
+    courses_list = list(courses.values())
+    timings["load_courses"] = time.perf_counter() - start
+    print(f"Loaded {len(courses_list)} courses ({generated} needed tokenizing)")
+
+    start = time.perf_counter()
+    inv_idx = build_inverted_index(courses_list, n_jobs=os.cpu_count() or 1)
+    idf = compute_idf(inv_idx, len(courses_list))
+    doc_norms = compute_doc_norms(inv_idx, idf, len(courses_list))
+    inv_idx = {key: val for key, val in inv_idx.items() if key in idf}
+    terms, offsets, docs, tfs = flatten_inverted_index(inv_idx)
+    timings["inverted_index"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorizer, svd, X_reduced = build_semantic_search(courses_list, tokenizer)
+    timings["semantic_search"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    course_codes, bert_embeddings = joblib.load(sources["bert_embeddings"])
+    title_course_codes, title_embeddings = joblib.load(sources["bert_title_embeddings"])
+    timings["embeddings"] = time.perf_counter() - start
+
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    arrays = {
+        "postings_offsets": offsets,
+        "postings_docs": docs,
+        "postings_tfs": tfs,
+        "idf": np.array([idf[term] for term in terms], dtype=np.float64),
+        "doc_norms": np.asarray(doc_norms, dtype=np.float64),
+        "tfidf_idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+        "svd_components": np.ascontiguousarray(svd.components_),
+        "svd_X_reduced": np.ascontiguousarray(X_reduced),
+        # Stored L2-normalized so cosine similarity is a plain dot product against the mmapped rows.
+        "bert_embeddings": normalize_rows(bert_embeddings),
+        "bert_title_embeddings": normalize_rows(title_embeddings),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+
+    start = time.perf_counter()
+    ivf_index = build_ivf_index(arrays["bert_embeddings"])
+    save_ivf_index(ivf_index, tmp_dir)
+    timings["ivf_index"] = time.perf_counter() - start
+
+    for kind in QUANTIZED_ARRAYS:
+        start = time.perf_counter()
+        save_quantized_index(build_quantized_index(kind, arrays["bert_embeddings"], normalized=True), tmp_dir)
+        save_quantized_index(build_quantized_index(kind, arrays["bert_title_embeddings"], normalized=True),
+                             os.path.join(tmp_dir, TITLE_INDEX_DIR))
+        timings[f"{kind}_index"] = time.perf_counter() - start
+
+    timings.update(build_neighbour_graphs(
+        tmp_dir, arrays["bert_embeddings"], KeywordIndex(inv_idx, idf, doc_norms), NEIGHBOUR_K))
+
+    _write_json(os.path.join(tmp_dir, "courses.json"), courses)
+    _write_json(os.path.join(tmp_dir, "terms.json"), terms)
+    _write_json(os.path.join(tmp_dir, "tfidf_vocabulary.json"), vectorizer.get_feature_names_out().tolist())
+    _write_json(os.path.join(tmp_dir, "course_codes.json"), list(course_codes))
+    _write_json(os.path.join(tmp_dir, "title_course_codes.json"), list(title_course_codes))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "sources": {name: file_sha256(path) for name, path in sources.items() if os.path.exists(path)},
+        "n_docs": len(courses_list),
+        "n_terms": len(terms),
+        "n_postings": int(offsets[-1]),
+        "n_components": int(svd.components_.shape[0]),
+        "ivf_lists": ivf_index.n_lists,
+        "quantized_indexes": sorted(QUANTIZED_ARRAYS),
+        "neighbour_k": NEIGHBOUR_K,
+        "embeddings_normalized": True,
+        "arrays": sorted(arrays),
+        "build_seconds": {phase: round(seconds, 3) for phase, seconds in timings.items()},
+    }
+    _write_json(os.path.join(tmp_dir, "manifest.json"), manifest)
+
+    old_dir = f"{output_dir}.old-{os.getpid()}"
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"Saved search snapshot v{SNAPSHOT_VERSION} to {output_dir}")
+    return manifest
+
+
+def read_manifest(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    return _read_json(path)
+
+
+def is_snapshot_fresh(manifest, sources=SOURCE_FILES):
+    """
+    Checks the manifest format/version and that no available source file has changed since the build.
+    """
+    if not manifest or manifest.get("format") != SNAPSHOT_FORMAT:
+        return False
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        print(f"Search snapshot version {manifest.get('version')} does not match {SNAPSHOT_VERSION}")
+        return False
+    for name, digest in manifest.get("sources", {}).items():
+        path = sources.get(name)
+        if path and os.path.exists(path) and file_sha256(path) != digest:
+            print(f"Search snapshot is stale: {name} changed since it was built")
+            return False
+    return True
+
+
+def load_array(snapshot_dir, name, mmap=True):
+    return np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r" if mmap else None)
+
+
+def load_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR, sources=SOURCE_FILES):
+    """
+    Loads a snapshot written by build_snapshot.
+
+    Returns:
+        dict: The search artifacts keyed the way app.py names them, or None when there is
+              no usable snapshot (missing, wrong version, or stale) and the caller should rebuild.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None or not is_snapshot_fresh(manifest, sources):
+        return None
+
+    terms = _read_json(os.path.join(snapshot_dir, "terms.json"))
+    inv_idx = PostingsIndex(
+        terms,
+        load_array(snapshot_dir, "postings_offsets"),
+        load_array(snapshot_dir, "postings_docs"),
+        load_array(snapshot_dir, "postings_tfs"),
+    )
+    idf = dict(zip(terms, load_array(snapshot_dir, "idf").tolist()))
+
+    return {
+        "manifest": manifest,
+        "courses": _read_json(os.path.join(snapshot_dir, "courses.json")),
+        "inv_idx": inv_idx,
+        "idf": idf,
+        "doc_norms": load_array(snapshot_dir, "doc_norms"),
+        # Raw arrays: similarity.restore_semantic_search rebuilds the vectorizer and SVD from them when first needed.
+        "tfidf_vocabulary": _read_json(os.path.join(snapshot_dir, "tfidf_vocabulary.json")),
+        "tfidf_idf": load_array(snapshot_dir, "tfidf_idf", mmap=False),
+        "svd_components": load_array(snapshot_dir, "svd_components"),
+        "X_reduced": load_array(snapshot_dir, "svd_X_reduced"),
+        "course_codes": _read_json(os.path.join(snapshot_dir, "course_codes.json")),
+        "bert_embeddings": load_array(snapshot_dir, "bert_embeddings"),
+        "title_course_codes": _read_json(os.path.join(snapshot_dir, "title_course_codes.json")),
+        "title_embeddings": load_array(snapshot_dir, "bert_title_embeddings"),
+    }
+
+
+if __name__ == "__main__":
+    build_snapshot(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SNAPSHOT_DIR)
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+import traceback
+
+# How models and search indexes are loaded: "eager" (while the app is imported), "background"
+# (a warm-up thread started at import) or "lazy" (on the first request that needs them).
+# Lazy by default so that importing app from scripts or tools starts nothing; gunicorn.conf.py
+# selects eager and `python app.py` background.
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "lazy")
+
+
+class Lazy:
+    """
+    A component that is built by `loader` the first time get() is called, exactly once even
+    when several threads ask for it at the same time.
+
+    Args:
+        loader (function): Builds and returns the component.
+        name (str): Used in logs and in status().
+    """
+
+    def __init__(self, loader, name):
+        self.loader = loader
+        self.name = name
+        self.load_seconds = None
+        self.error = None
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self.loader()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.error = None
+                self._loaded = True
+                print(f"Loaded {self.name} in {self.load_seconds:.2f}s")
+        return self._value
+
+    def status(self):
+        return {"loaded": self._loaded, "load_seconds": self.load_seconds, "error": self.error}
+
+
+def warm_up(components, mode=MODEL_WARMUP):
+    """
+    Loads the Lazy components now ("eager"), in a daemon thread ("background"), or not at all ("lazy").
+
+    Returns:
+        threading.Thread or None: The warm-up thread in background mode.
+    """
+    def load_all():
+        for component in components:
+            try:
+                component.get()
+            except Exception as e:
+                print(f"Error loading {component.name}: {e}")
+                traceback.print_exc()
+
+    if mode == "eager":
+        load_all()
+    elif mode == "background":
+        thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+    return None
+
+
+class StartupTimer:
+    """
+    Records how long each startup phase took. mark(name) closes the phase that started at the previous mark.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = {}
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0) + now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        return {"phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                "total": round(self.total, 3)}
+
+    def print_report(self):
+        print("Startup timings:")
+        for name, seconds in self.phases.items():
+            print(f"  {name:<24} {seconds:7.2f}s")
+        print(f"  {'total':<24} {self.total:7.2f}s")
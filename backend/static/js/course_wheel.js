@@ -7,7 +7,7 @@ document.addEventListener("DOMContentLoaded", function () {
   let autoScrollPaused = false;
   let autoScrollInterval = null;
 
-  fetch("/api/get_courses")
+  fetch("/api/get_courses?fields=course_code")
     .then((response) => response.json())
     .then((data) => {
       if (data && data.courses && data.courses.length > 0) {
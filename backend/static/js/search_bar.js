@@ -68,7 +68,7 @@ document.addEventListener("DOMContentLoaded", function () {
   }
 
   function fetchAllCourses() {
-    fetch("/api/get_courses")
+    fetch("/api/get_courses?fields=course_code,course%20title,title")
       .then((response) => response.json())
       .then((data) => {
         allCourses = data.courses.sort((a, b) => {
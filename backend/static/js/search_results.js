@@ -1,5 +1,6 @@
 let relevantIds = [];
 let nonRelevantIds = [];
+let feedbackSession = null;
 
 document.addEventListener("DOMContentLoaded", function () {
   const query = window.serverData?.query || "";
@@ -83,6 +84,7 @@ document.addEventListener("DOMContentLoaded", function () {
         relevant_ids: JSON.stringify(relevantIds),
         non_relevant_ids: JSON.stringify(nonRelevantIds),
       });
+      if (feedbackSession) params.set("session_id", feedbackSession);
       apiUrl = `/api/course?${params.toString()}`;
     } else {
       const params = new URLSearchParams({
@@ -90,6 +92,7 @@ document.addEventListener("DOMContentLoaded", function () {
         relevant_ids: JSON.stringify(relevantIds),
         non_relevant_ids: JSON.stringify(nonRelevantIds),
       });
+      if (feedbackSession) params.set("session_id", feedbackSession);
       apiUrl = `/api/search?${params.toString()}`;
     }
 
@@ -103,6 +106,8 @@ document.addEventListener("DOMContentLoaded", function () {
             throw new Error(`API returned ${response.status}: ${text}`);
           });
         }
+        feedbackSession =
+          response.headers.get("X-Feedback-Session") || feedbackSession;
         return response.json();
       })
       .then((data) => {
@@ -0,0 +1,124 @@
+"""
+Crawls recorded roster pages (tests/fixtures/roster) served by a local http.server, including
+503 responses, to check retries and resuming from the checkpoint.
+"""
+import json
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("bs4")
+
+import course_scrapper  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "roster")
+PAGES = {
+    "/browse/roster/SP25": "index.html",
+    "/browse/roster/SP25/subject/CS": "subject_CS.html",
+    "/browse/roster/SP25/subject/MATH": "subject_MATH.html",
+    "/browse/roster/SP25/class/CS/1110": "class_CS_1110.html",
+    "/browse/roster/SP25/class/CS/2110": "class_CS_2110.html",
+    "/browse/roster/SP25/class/MATH/2210": "class_MATH_2210.html",
+}
+
+
+class RosterHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests[self.path] += 1
+        failures = self.server.failures.get(self.path, 0)
+        if failures:
+            # A negative count fails every request
+            self.server.failures[self.path] = failures - 1
+            self.send_error(503)
+            return
+        if self.path not in PAGES:
+            self.send_error(404)
+            return
+        with open(os.path.join(FIXTURES, PAGES[self.path]), "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def roster():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RosterHandler)
+    server.requests = Counter()
+    server.failures = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read_output(output_dir):
+    with open(os.path.join(output_dir, "courses_info.json"), "r") as f:
+        return json.load(f)
+
+
+def test_crawl_parses_every_class(roster, tmp_path):
+    failed = course_scrapper.crawl("SP25", roster.url, str(tmp_path), workers=2)
+
+    assert failed == []
+    data = read_output(tmp_path)
+    assert set(data) == {"CS 1110", "CS 2110", "MATH 2210"}
+    assert data["CS 1110"] == {
+        "description": "Programming and problem solving using Python.",
+        "term_offered": ["Fall", " Spring", " Summer"],
+        "distributions": ["SMR-AS", "SDS-AS"],
+        "course title": "Introduction to Computing: A Design and Development Perspective",
+    }
+    assert data["CS 2110"]["distributions"] == []
+    assert all(count == 1 for count in roster.requests.values())
+
+
+def test_server_errors_are_retried(roster, tmp_path):
+    roster.failures["/browse/roster/SP25/subject/CS"] = 1
+    roster.failures["/browse/roster/SP25/class/MATH/2210"] = 2
+
+    failed = course_scrapper.crawl("SP25", roster.url, str(tmp_path), workers=2, retries=3)
+
+    assert failed == []
+    assert roster.requests["/browse/roster/SP25/subject/CS"] == 2
+    assert roster.requests["/browse/roster/SP25/class/MATH/2210"] == 3
+    assert set(read_output(tmp_path)) == {"CS 1110", "CS 2110", "MATH 2210"}
+
+
+def test_resume_skips_checkpointed_subjects(roster, tmp_path):
+    roster.failures["/browse/roster/SP25/subject/MATH"] = -1
+
+    failed = course_scrapper.crawl("SP25", roster.url, str(tmp_path), workers=2, retries=1)
+
+    assert failed == ["MATH"]
+    assert set(read_output(tmp_path)) == {"CS 1110", "CS 2110"}
+    with open(os.path.join(tmp_path, "course_scrapper_checkpoint.json"), "r") as f:
+        assert json.load(f) == {"term": "SP25", "subjects": ["CS"]}
+
+    roster.failures.clear()
+    roster.requests.clear()
+    failed = course_scrapper.crawl("SP25", roster.url, str(tmp_path), workers=2, retries=1)
+
+    assert failed == []
+    assert set(read_output(tmp_path)) == {"CS 1110", "CS 2110", "MATH 2210"}
+    assert "/browse/roster/SP25/subject/CS" not in roster.requests
+    assert roster.requests["/browse/roster/SP25/subject/MATH"] == 1
+
+
+def test_checkpoint_of_another_term_is_refused(roster, tmp_path):
+    course_scrapper.crawl("SP25", roster.url, str(tmp_path))
+
+    with pytest.raises(SystemExit):
+        course_scrapper.CrawlState(str(tmp_path), "FA25")
+    assert course_scrapper.CrawlState(str(tmp_path), "FA25", fresh=True).done == set()
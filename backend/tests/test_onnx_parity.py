@@ -0,0 +1,49 @@
+"""
+Parity of the quantized ONNX query encoder with the PyTorch sentence_transformers model.
+
+Needs onnxruntime, torch, sentence_transformers and an export in ONNX_MODEL_DIR
+(python onnx_inference.py export); skipped otherwise.
+"""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from onnx_inference import ENCODER_DIR, MODEL_FILE, ONNX_MODEL_DIR, OnnxSentenceEncoder  # noqa: E402
+
+MIN_COSINE = 0.99
+SENTENCES = [
+    "Introduction to Computing Using Python",
+    "machine learning with lots of projects",
+    "an easy history class about ancient Rome",
+    "Organic Chemistry I",
+    "I want a writing seminar with small discussion sections",
+    "linear algebra for engineers",
+    "boring and way too much work",
+    "x",
+]
+
+encoder_dir = os.path.join(ONNX_MODEL_DIR, ENCODER_DIR)
+pytestmark = pytest.mark.skipif(not os.path.exists(os.path.join(encoder_dir, MODEL_FILE)),
+                                reason=f"no exported encoder in {encoder_dir}")
+
+
+def test_quantized_encoder_matches_torch():
+    expected = sentence_transformers.SentenceTransformer("all-MiniLM-L6-v2").encode(
+        SENTENCES, normalize_embeddings=True)
+    actual = OnnxSentenceEncoder(encoder_dir).encode(SENTENCES)
+
+    assert actual.shape == expected.shape
+    cosines = (expected * actual).sum(axis=1)
+    assert cosines.min() >= MIN_COSINE, dict(zip(SENTENCES, np.round(cosines, 4)))
+
+
+def test_single_sentence_matches_batch():
+    encoder = OnnxSentenceEncoder(encoder_dir)
+    batch = encoder.encode(SENTENCES)
+    for sentence, row in zip(SENTENCES, batch):
+        assert float(encoder.encode(sentence) @ row) >= MIN_COSINE
@@ -0,0 +1,111 @@
+"""
+Review parsing, the readiness wait and the checkpoint store, on recorded CU Reviews pages
+(tests/fixtures/reviews). The browser is replaced by a driver that serves those pages.
+"""
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("pandas")
+pytest.importorskip("selenium")
+
+from bs4 import BeautifulSoup  # noqa: E402
+from selenium.common.exceptions import TimeoutException  # noqa: E402
+from selenium.webdriver.common.by import By  # noqa: E402
+
+import reviews_scrapper  # noqa: E402
+from reviews_scrapper import ReviewStore, parse_reviews, wait_for_reviews  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "reviews")
+
+
+def page(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class RecordedDriver:
+    """
+    Serves a sequence of recorded page states, moving to the next one on each poll, the way a
+    client-side render fills in the page.
+    """
+
+    def __init__(self, *pages):
+        self.pages = [BeautifulSoup(page(name), "html.parser") for name in pages]
+        self.polls = 0
+
+    def find_elements(self, by, value):
+        soup = self.pages[min(self.polls, len(self.pages) - 1)]
+        self.polls += 1
+        if by == By.CLASS_NAME:
+            return soup.find_all(class_=value)
+        if by == By.CSS_SELECTOR:
+            return soup.select(value)
+        raise AssertionError(f"unexpected locator {by}")
+
+
+def test_parse_reviews():
+    reviews = parse_reviews(page("course_with_reviews.html"))
+
+    assert reviews == [
+        {"overall": "4", "difficulty": "3", "workload": "4", "professor": "Walker White", "grade": "A",
+         "major": "Computer Science",
+         "comment": "Great first programming class, the assignments are long but worth it."},
+        {"overall": "2", "difficulty": "5", "workload": "5", "professor": "Lillian Lee", "grade": "B"},
+    ]
+    assert parse_reviews(page("course_without_reviews.html")) == []
+
+
+def test_wait_returns_once_review_cards_render():
+    driver = RecordedDriver("shell.html", "shell.html", "course_with_reviews.html")
+    start = time.monotonic()
+    wait_for_reviews(driver, timeout=5, empty_grace=30)
+    assert time.monotonic() - start < 5
+
+
+def test_wait_accepts_a_rendered_page_without_reviews_after_the_grace_period():
+    driver = RecordedDriver("shell.html", "course_without_reviews.html")
+    start = time.monotonic()
+    wait_for_reviews(driver, timeout=5, empty_grace=0.3)
+    assert 0.3 <= time.monotonic() - start < 5
+
+
+def test_wait_times_out_when_the_page_never_renders():
+    with pytest.raises(TimeoutException):
+        wait_for_reviews(RecordedDriver("shell.html"), timeout=0.5, empty_grace=0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    seed_path = tmp_path / "course_reviews.json"
+    seed_path.write_text(json.dumps({"CS 1110": [{"overall": "4"}], "CLASS 4650": []}))
+    return ReviewStore(str(tmp_path / "course_reviews.jsonl"), str(seed_path))
+
+
+def test_empty_result_is_recorded_and_fresh(store):
+    max_age = 30 * 86400
+    assert store.is_stale("CLASS 4650", max_age)
+
+    assert store.add("CLASS 4650", [])
+
+    assert not store.is_stale("CLASS 4650", max_age)
+    reloaded = ReviewStore(store.path, os.path.join(os.path.dirname(store.path), "course_reviews.json"))
+    assert not reloaded.is_stale("CLASS 4650", max_age)
+    assert reloaded.reviews(["CLASS 4650"]) == {"CLASS 4650": []}
+
+
+def test_empty_result_never_replaces_reviews(store):
+    assert not store.add("CS 1110", [])
+
+    assert store.reviews(["CS 1110"]) == {"CS 1110": [{"overall": "4"}]}
+    assert store.is_stale("CS 1110", 30 * 86400)
+    assert not os.path.exists(store.path)
+
+
+def test_defaults_wait_for_a_rendered_course_page():
+    assert reviews_scrapper.PAGE_READY_SELECTOR
+    assert BeautifulSoup(page("course_without_reviews.html"), "html.parser").select(reviews_scrapper.PAGE_READY_SELECTOR)
+    assert not BeautifulSoup(page("shell.html"), "html.parser").select(reviews_scrapper.PAGE_READY_SELECTOR)
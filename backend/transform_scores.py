@@ -1,12 +1,10 @@
-import json 
+import json
 import os
 
 base_path = os.path.dirname(os.path.abspath(__file__))
 output_path = os.path.join(base_path, "scaled_sentiment_scores.json")
-filename = "review_sentiments.json"
-with open(filename, 'r') as f:
-    course_sentiments = json.load(f)
-    
+filename = os.path.join(base_path, "review_sentiments.json")
+
 
 def scale_review_score(score):
     if score is None:
@@ -16,9 +14,15 @@ def scale_review_score(score):
     else:
         return min(100, round(50 * score + 50))
 
-# Apply the transformation
-scaled_scores = {course: scale_review_score(score) for course, score in course_sentiments.items()}
 
-with open(output_path, "w") as f:
-    json.dump(scaled_scores, f, indent = 2)
-print("Scaled scores and saved to scaled_sentiment_scores.json")
\ No newline at end of file
+# generate_review_sentiments.py already writes the scaled scores; this rescales an existing review_sentiments.json.
+if __name__ == "__main__":
+    with open(filename, 'r') as f:
+        course_sentiments = json.load(f)
+
+    # Apply the transformation
+    scaled_scores = {course: scale_review_score(score) for course, score in course_sentiments.items()}
+
+    with open(output_path, "w") as f:
+        json.dump(scaled_scores, f, indent = 2)
+    print("Scaled scores and saved to scaled_sentiment_scores.json")
@@ -0,0 +1,495 @@
+"""
+Vector indexes over the BERT course embeddings.
+
+Interchangeable backends answer "top-k courses by cosine similarity to this vector":
+
+- ExactIndex scans every row (one matrix-vector product).
+- IVFIndex clusters the rows with spherical k-means and only scans the `nprobe` clusters
+  whose centroids are closest to the query, so query cost grows with N / n_lists * nprobe
+  instead of N. `nprobe` is the recall/latency knob: nprobe == n_lists is exact.
+- ScalarQuantizedIndex scans int8 codes, 4x smaller than the float32 rows, and PQIndex scans product-quantization codes (one byte per subspace). Both re-rank their
+  top `rerank` candidates with the exact vectors, which can stay mmapped on disk since only
+  those few rows are read.
+
+EmbeddingIndex bundles the normalized description and title matrices behind one of these
+backends and is what app.py queries. Titles have no IVF lists, but the int8 and PQ backends
+compress them too.
+
+The IVF, int8 and PQ indexes are built offline (python vector_index.py, or as part of
+snapshot.py) and stored as .npy files next to the embeddings, the title codes in a title/
+subdirectory.
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+IVF_ARRAYS = ("ivf_centroids", "ivf_offsets", "ivf_order", "ivf_vectors")
+QUANTIZED_ARRAYS = {
+    "int8": ("sq8_codes", "sq8_scales"),
+    "pq": ("pq_codebooks", "pq_codes"),
+}
+TITLE_INDEX_DIR = "title"
+
+VECTOR_INDEX_BACKEND = os.environ.get("VECTOR_INDEX_BACKEND", "exact")
+VECTOR_INDEX_NPROBE = int(os.environ.get("VECTOR_INDEX_NPROBE", 8))
+# Candidates taken from the compressed scan and re-scored with the exact vectors
+VECTOR_INDEX_RERANK = int(os.environ.get("VECTOR_INDEX_RERANK", 200))
+# Compressed codes are decoded and scored this many rows at a time, small enough that the
+# decoded block stays in cache and no full float32 copy is made
+SCAN_BLOCK_ROWS = 512
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return np.ascontiguousarray(matrix / norms)
+
+
+def spill_to_mmap(vectors):
+    """
+    Writes `vectors` to a temporary .npy file and returns it mmapped read-only, so the rows sit in
+    the page cache (evictable, and shared by forked workers) instead of the heap. The file is
+    unlinked at once; the mapping keeps its data alive.
+    """
+    fd, path = tempfile.mkstemp(suffix=".npy")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+        return np.load(path, mmap_mode="r")
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            # Windows cannot remove a mapped file; it is left in the temporary directory.
+            pass
+
+
+def top_k(scores, k):
+    """
+    Returns the indices of the k largest scores, best first, without sorting all of them.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search over L2-normalized rows.
+    """
+
+    name = "exact"
+
+    def __init__(self, vectors, normalized=False):
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, query_vector, k=10):
+        query = normalize_rows(query_vector)
+        scores = self.vectors @ query
+        return [(float(scores[i]), int(i)) for i in top_k(scores, k)]
+
+
+class IVFIndex:
+    """
+    Inverted-file index: rows are grouped by their nearest k-means centroid and stored
+    contiguously per list, so probing a list is one slice and one matrix-vector product.
+    """
+
+    name = "ivf"
+
+    def __init__(self, centroids, offsets, order, vectors, nprobe=VECTOR_INDEX_NPROBE):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.order = order
+        self.vectors = vectors
+        self.nprobe = nprobe
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def search(self, query_vector, k=10, nprobe=None):
+        query = normalize_rows(query_vector)
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probed = top_k(self.centroids @ query, nprobe)
+
+        positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in probed])
+        if len(positions) == 0:
+            return []
+        scores = self.vectors[positions] @ query
+        best = top_k(scores, k)
+        return [(float(scores[i]), int(self.order[positions[i]])) for i in best]
+
+
+class _RerankedIndex:
+    """
+    Shared search for the compressed indexes: approximate scores for every row from the codes,
+    then exact cosine scores for the best `rerank` rows only.
+
+    Subclasses set `vectors` (the full-precision normalized rows used for re-ranking) and
+    `rerank`, and define approximate_scores(queries), which maps a (q, d) array of normalized
+    queries to a (q, n) array of approximate scores for every row.
+    """
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def _rerank(self, query, approx, k):
+        candidates = np.sort(top_k(approx, max(k, self.rerank)))
+        scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+        return [(float(scores[i]), int(candidates[i])) for i in top_k(scores, k)]
+
+    def search(self, query_vector, k=10):
+        return self.search_many(query_vector, k)[0]
+
+    def search_many(self, query_vectors, k=10):
+        queries = normalize_rows(np.atleast_2d(query_vectors))
+        approx = self.approximate_scores(queries)
+        return [self._rerank(query, row, k) for query, row in zip(queries, approx)]
+
+
+class ScalarQuantizedIndex(_RerankedIndex):
+    """
+    Per-dimension scalar quantization: row x is stored as codes = round(x / scales) in int8,
+    so x . q ~= codes . (q * scales) and the scan reads one byte per dimension.
+    """
+
+    name = "int8"
+
+    def __init__(self, codes, scales, vectors, rerank=VECTOR_INDEX_RERANK):
+        self.codes = codes
+        self.scales = np.asarray(scales, dtype=np.float32)
+        self.vectors = vectors
+        self.rerank = rerank
+
+    def approximate_scores(self, queries):
+        weighted = (queries * self.scales).T
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), SCAN_BLOCK_ROWS):
+            block = self.codes[start:start + SCAN_BLOCK_ROWS]
+            scores[:, start:start + len(block)] = (block.astype(np.float32) @ weighted).T
+        return scores
+
+
+class PQIndex(_RerankedIndex):
+    """
+    Product quantization: each row is split into `m` subvectors, and each subvector is stored as
+    the byte id of its nearest centroid in that subspace's 256-entry codebook. A query's scores
+    are sums of m lookups into a (m, 256) table of query-centroid dot products.
+    """
+
+    name = "pq"
+
+    def __init__(self, codebooks, codes, vectors, rerank=VECTOR_INDEX_RERANK):
+        self.codebooks = codebooks
+        self.codes = codes
+        self.vectors = vectors
+        self.rerank = rerank
+
+    def approximate_scores(self, queries):
+        m, n_centroids, sub_dim = self.codebooks.shape
+        subspaces = np.arange(m)
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for qi, query in enumerate(queries):
+            table = np.einsum("mcd,md->mc", self.codebooks, query.reshape(m, sub_dim))
+            for start in range(0, len(self.codes), SCAN_BLOCK_ROWS):
+                block = self.codes[start:start + SCAN_BLOCK_ROWS]
+                scores[qi, start:start + len(block)] = table[subspaces, block].sum(axis=1)
+        return scores
+
+
+def quantize_int8(vectors):
+    """
+    Symmetric per-dimension int8 codes and scales for the rows of `vectors`.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=0) / 127
+    scales[scales == 0] = 1
+    codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def kmeans(vectors, n_clusters, n_iter=20, seed=42):
+    """
+    Euclidean k-means; returns the centroids and each row's assignment.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+        assignments = np.argmin(distances, axis=1)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = counts == 0
+        sums[~empty] /= counts[~empty, None]
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = sums
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return centroids, np.argmin(distances, axis=1)
+
+
+def build_pq_codes(vectors, m=48, n_centroids=256, n_iter=20, seed=42, sample_size=50000):
+    """
+    Trains one codebook per subspace on a sample of the rows and encodes every row.
+
+    Returns:
+        tuple: codebooks (m, n_centroids, d / m) float32 and codes (n, m) uint8.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    if d % m:
+        raise ValueError(f"Embedding dimension {d} is not divisible by {m} PQ subspaces")
+    n_centroids = min(n_centroids, n, 256)
+    sub_dim = d // m
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(n, sample_size, replace=False)] if n > sample_size else vectors
+
+    codebooks = np.empty((m, n_centroids, sub_dim), dtype=np.float32)
+    codes = np.empty((n, m), dtype=np.uint8)
+    for j in range(m):
+        columns = slice(j * sub_dim, (j + 1) * sub_dim)
+        codebooks[j], _ = kmeans(sample[:, columns], n_centroids, n_iter=n_iter, seed=seed + j)
+        distances = (codebooks[j] ** 2).sum(axis=1) - 2 * vectors[:, columns] @ codebooks[j].T
+        codes[:, j] = np.argmin(distances, axis=1)
+    return codebooks, codes
+
+
+def build_quantized_index(kind, embeddings, rerank=VECTOR_INDEX_RERANK, normalized=False):
+    """A ScalarQuantizedIndex ("int8") or PQIndex ("pq") over the embeddings."""
+    vectors = embeddings if normalized else normalize_rows(embeddings)
+    if kind == "int8":
+        return ScalarQuantizedIndex(*quantize_int8(vectors), vectors, rerank=rerank)
+    if kind == "pq":
+        return PQIndex(*build_pq_codes(vectors), vectors, rerank=rerank)
+    raise ValueError(f"Unknown quantized index {kind}")
+
+
+def save_quantized_index(index, directory):
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(index, PQIndex):
+        arrays = {"pq_codebooks": index.codebooks, "pq_codes": index.codes}
+    else:
+        arrays = {"sq8_codes": index.codes, "sq8_scales": index.scales}
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+
+
+def has_quantized_index(kind, directory):
+    names = QUANTIZED_ARRAYS.get(kind)
+    return bool(names) and all(os.path.exists(os.path.join(directory, f"{name}.npy")) for name in names)
+
+
+def load_quantized_index(kind, directory, vectors, rerank=VECTOR_INDEX_RERANK, mmap=True):
+    """`vectors` are the L2-normalized rows used for re-ranking, typically mmapped."""
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+              for name in QUANTIZED_ARRAYS[kind]]
+    if kind == "pq":
+        return PQIndex(np.asarray(arrays[0]), arrays[1], vectors, rerank=rerank)
+    return ScalarQuantizedIndex(arrays[0], arrays[1], vectors, rerank=rerank)
+
+
+def spherical_kmeans(vectors, n_lists, n_iter=20, seed=42, sample_size=50000):
+    """
+    k-means on the unit sphere (cosine distance), fitted on a sample of the rows.
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > sample_size:
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty clusters with random rows so every list stays in use.
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def build_ivf_index(embeddings, n_lists=None, n_iter=20, seed=42, nprobe=VECTOR_INDEX_NPROBE):
+    vectors = normalize_rows(embeddings)
+    if n_lists is None:
+        n_lists = max(1, int(np.sqrt(len(vectors))))
+    n_lists = min(n_lists, len(vectors))
+
+    centroids = spherical_kmeans(vectors, n_lists, n_iter=n_iter, seed=seed)
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+    order = np.argsort(assignments, kind="stable").astype(np.int32)
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assignments, minlength=n_lists), out=offsets[1:])
+
+    return IVFIndex(centroids, offsets, order, np.ascontiguousarray(vectors[order]), nprobe=nprobe)
+
+
+def save_ivf_index(index, directory):
+    os.makedirs(directory, exist_ok=True)
+    for name in IVF_ARRAYS:
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(index, name.split("_", 1)[1]))
+
+
+def load_ivf_index(directory, nprobe=VECTOR_INDEX_NPROBE, mmap=True):
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+              for name in IVF_ARRAYS]
+    return IVFIndex(*arrays, nprobe=nprobe)
+
+
+def has_ivf_index(directory):
+    return all(os.path.exists(os.path.join(directory, f"{name}.npy")) for name in IVF_ARRAYS)
+
+
+def load_vector_index(embeddings, directory=None, backend=VECTOR_INDEX_BACKEND, nprobe=VECTOR_INDEX_NPROBE,
+                      normalized=False):
+    """
+    Returns the configured index over `embeddings`, falling back to ExactIndex when the
+    IVF backend is requested but no prebuilt IVF index exists in `directory`. The int8 and
+    PQ backends load their prebuilt codes when present and are built from `embeddings` otherwise.
+    """
+    if backend == "ivf":
+        if directory and has_ivf_index(directory):
+            return load_ivf_index(directory, nprobe=nprobe)
+        print("No prebuilt IVF index found, falling back to exact vector search")
+    elif backend in QUANTIZED_ARRAYS:
+        if directory and has_quantized_index(backend, directory):
+            return load_quantized_index(backend, directory, embeddings if normalized else normalize_rows(embeddings))
+        print(f"No prebuilt {backend} codes found, quantizing the embeddings at startup")
+        return build_quantized_index(backend, embeddings, normalized=normalized)
+    return ExactIndex(embeddings, normalized=normalized)
+
+
+class EmbeddingIndex:
+    """
+    Owns the L2-normalized, contiguous float32 description and title embedding matrices.
+
+    Cosine similarity against a normalized matrix is a single matrix-vector product, so
+    nothing is re-normalized per request. Description top-k goes through `backend`
+    (ExactIndex by default, or an IVF, int8 or PQ index over the same rows) and title top-k
+    through `title_backend`.
+    """
+
+    def __init__(self, description_codes, description_embeddings, title_codes, title_embeddings,
+                 backend=None, normalized=False):
+        self.description_codes = list(description_codes)
+        self.title_codes = list(title_codes)
+        self.description = description_embeddings if normalized else normalize_rows(description_embeddings)
+        self.title = title_embeddings if normalized else normalize_rows(title_embeddings)
+        self.title_rows = {code: i for i, code in enumerate(self.title_codes)}
+        self.backend = backend or ExactIndex(self.description, normalized=True)
+        self.title_backend = ExactIndex(self.title, normalized=True)
+
+    def load_backends(self, directory=None, backend=VECTOR_INDEX_BACKEND):
+        """
+        Puts description and title search behind `backend`, loading prebuilt indexes from
+        `directory` (titles from its TITLE_INDEX_DIR). Titles keep the exact scan with "ivf".
+
+        With the int8 and PQ backends the float32 rows are only read for re-ranking and
+        per-candidate scores, so rows not already mmapped from a snapshot are moved to an mmap
+        and only the codes stay on the heap.
+        """
+        self.backend = load_vector_index(self.description, directory, backend, normalized=True)
+        if backend not in QUANTIZED_ARRAYS:
+            self.title_backend = ExactIndex(self.title, normalized=True)
+            return
+        title_directory = os.path.join(directory, TITLE_INDEX_DIR) if directory else None
+        self.title_backend = load_vector_index(self.title, title_directory, backend, normalized=True)
+        if not isinstance(self.description, np.memmap):
+            self.description = self.backend.vectors = spill_to_mmap(self.description)
+        if not isinstance(self.title, np.memmap):
+            self.title = self.title_backend.vectors = spill_to_mmap(self.title)
+
+    def __len__(self):
+        return len(self.description)
+
+    def vector(self, row):
+        return self.description[row]
+
+    def search(self, query_vector, k=10):
+        return self.backend.search(query_vector, k)
+
+    def search_many(self, query_vectors, k=10):
+        """
+        Top-k description matches for each row of `query_vectors`. With the exact backend
+        this is one matrix-matrix product for the whole batch.
+        """
+        queries = normalize_rows(np.atleast_2d(query_vectors))
+        if isinstance(self.backend, _RerankedIndex):
+            return self.backend.search_many(queries, k)
+        if not isinstance(self.backend, ExactIndex):
+            return [self.backend.search(query, k) for query in queries]
+        scores = queries @ self.description.T
+        return [[(float(row_scores[i]), int(i)) for i in top_k(row_scores, k)] for row_scores in scores]
+
+    def title_search_many(self, query_vectors, k=10):
+        """Top-k title matches (score, title_row) for each row of `query_vectors`."""
+        queries = normalize_rows(np.atleast_2d(query_vectors))
+        if isinstance(self.title_backend, _RerankedIndex):
+            return self.title_backend.search_many(queries, k)
+        scores = queries @ self.title.T
+        return [[(float(row_scores[i]), int(i)) for i in top_k(row_scores, k)] for row_scores in scores]
+
+    def description_scores(self, query_vector, rows):
+        """Cosine similarity between the query and the given description rows only."""
+        if not len(rows):
+            return np.empty(0, dtype=np.float32)
+        return np.asarray(self.description[np.asarray(rows)], dtype=np.float32) @ normalize_rows(query_vector)
+
+    def title_scores(self, query_vector, codes):
+        """
+        Cosine similarity between the query and the titles of `codes` only (0 for codes without a title embedding).
+        """
+        query = normalize_rows(query_vector)
+        rows = [self.title_rows[code] for code in codes if code in self.title_rows]
+        scores = self.title[rows] @ query if rows else []
+        score_map = dict(zip((code for code in codes if code in self.title_rows), map(float, scores)))
+        return {code: score_map.get(code, 0) for code in codes}
+
+
+def recall_at_k(exact_index, approx_index, queries, k=10):
+    hits = 0
+    for query in queries:
+        expected = {i for _, i in exact_index.search(query, k)}
+        hits += len(expected & {i for _, i in approx_index.search(query, k)})
+    return hits / (k * len(queries)) if len(queries) else 0.0
+
+
+if __name__ == "__main__":
+    import joblib
+    from snapshot import DEFAULT_SNAPSHOT_DIR, SOURCE_FILES
+
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SNAPSHOT_DIR
+    _, embeddings = joblib.load(SOURCE_FILES["bert_embeddings"])
+    index = build_ivf_index(embeddings)
+    save_ivf_index(index, output_dir)
+
+    queries = normalize_rows(embeddings)[:200]
+    exact = ExactIndex(embeddings)
+    for nprobe in (1, 2, 4, 8, 16):
+        index.nprobe = nprobe
+        print(f"nprobe={nprobe}: recall@10 = {recall_at_k(exact, index, queries):.3f}")
+    print(f"Saved IVF index with {index.n_lists} lists to {output_dir}")
+
+    print(f"float32 scan: {exact.vectors.nbytes / 2**20:.1f} MB")
+    for kind in QUANTIZED_ARRAYS:
+        quantized = build_quantized_index(kind, exact.vectors, normalized=True)
+        save_quantized_index(quantized, output_dir)
+        for rerank in (0, 50, 200):
+            quantized.rerank = rerank
+            print(f"{kind} ({quantized.codes.nbytes / 2**20:.1f} MB scan), rerank={rerank}: "
+                  f"recall@10 = {recall_at_k(exact, quantized, queries):.3f}")